@@ -1,57 +1,26 @@
+import json
 import os
+import sys
 
 import click
 
+from inter_service_compatibility.broker import create_broker_server
+from inter_service_compatibility.check_candidate import (
+    DEFAULT_RELEASED_VERSIONS_EXPRESSION,
+    check_candidate as run_candidate_check,
+)
+from inter_service_compatibility.corpus import parse_size_classes
+from inter_service_compatibility.events import configure_event_stream
+from inter_service_compatibility.measure_import_times_across_versions import measure_import_times_across_versions
+from inter_service_compatibility.outcome_cache import DEFAULT_CACHE_DIRECTORY, DEFAULT_MAX_CACHE_SIZE, OutcomeCache
+from inter_service_compatibility.performance_matrix import create_performance_matrix
+from inter_service_compatibility.process_answers_across_versions import process_answers_across_versions
 from inter_service_compatibility.process_questions_across_versions import process_questions_across_versions
 from inter_service_compatibility.record_questions_across_versions import record_questions_across_versions
-
-
-VERSIONS_TO_CHECK = [
-    "0.52.0",
-    "0.51.0",
-    "0.50.1",
-    "0.50.0",
-    "0.49.2",
-    "0.49.1",
-    "0.49.0",
-    "0.48.0",
-    "0.47.2",
-    "0.47.1",
-    "0.47.0",
-    "0.46.3",
-    "0.46.2",
-    "0.46.1",
-    "0.46.0",
-    "0.45.0",
-    "0.44.0",
-    "0.43.7",
-    "0.43.6",
-    "0.43.5",
-    "0.43.4",
-    "0.43.3",
-    "0.43.2",
-    "0.43.1",
-    "0.43.0",
-    "0.42.1",
-    "0.42.0",
-    "0.41.1",
-    "0.41.0",
-    "0.40.2",
-    "0.40.1",
-    "0.40.0",
-    "0.39.0",
-    "0.38.1",
-    "0.38.0",
-    "0.37.0",
-    "0.36.0",
-    "0.35.0",
-    "0.34.1",
-    "0.34.0",
-    "0.33.0",
-    "0.32.0",
-    "0.31.0",
-    "0.30.0",
-]
+from inter_service_compatibility.report import report_results
+from inter_service_compatibility.schemas import get_question_shapes
+from inter_service_compatibility.sharding import create_work_manifest, merge_result_fragments, run_worker, select_shard
+from inter_service_compatibility.versions import resolve_versions
 
 
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
@@ -71,8 +40,9 @@ def octue_compatibility_cli():
     "--parent-versions",
     type=str,
     default=None,
-    help="A comma-separated list of parent versions to record questions from e.g. '0.35.0,0.36.0'. The default is all "
-    "versions of the SDK from 0.16.0 upwards.",
+    help="A comma-separated list of parent versions to record questions from e.g. '0.35.0,0.36.0', or a range "
+    "expression resolved against the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is all "
+    "released versions of the SDK from 0.30.0 upwards.",
 )
 @click.option(
     "--questions-file",
@@ -81,6 +51,14 @@ def octue_compatibility_cli():
     show_default=True,
     help="The path to a JSONL (JSON lines) file to record questions from different Octue SDK versions.",
 )
+@click.option(
+    "--size-classes",
+    type=str,
+    default=None,
+    help="A comma-separated list of size classes to generate and record questions for as well as the standard "
+    "question e.g. 'datafiles-100,values-1mb', or 'all'. The size classes are: datafiles-1, datafiles-100, "
+    "datafiles-10k, metadata-deep, values-1kb, values-100kb, values-1mb, and values-10mb.",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -89,14 +67,15 @@ def octue_compatibility_cli():
     show_default=True,
     help="If provided, show all shell output.",
 )
-def record_questions(octue_sdk_repo_path, parent_versions, questions_file, verbose):
+def record_questions(octue_sdk_repo_path, parent_versions, questions_file, size_classes, verbose):
     """Record questions from parents running each of the given Octue SDK versions into a file for later processing."""
-    parent_versions = parse_versions_or_get_defaults(parent_versions)
+    parent_versions = parse_versions_or_get_defaults(parent_versions, octue_sdk_repo_path)
 
     record_questions_across_versions(
         octue_sdk_repo_path=octue_sdk_repo_path,
         parent_versions=parent_versions,
-        recording_file_path=questions_file,
+        recording_file_path=os.path.abspath(questions_file),
+        size_classes=parse_size_classes(size_classes),
         verbose=verbose,
     )
 
@@ -113,16 +92,18 @@ def record_questions(octue_sdk_repo_path, parent_versions, questions_file, verbo
     "--parent-versions",
     type=str,
     default=None,
-    help="A comma-separated list of parent versions to test (i.e. process questions from) e.g. '0.35.0,0.36.0'. The "
-    "default is all versions of the SDK from 0.16.0 upwards.",
+    help="A comma-separated list of parent versions to test (i.e. process questions from) e.g. '0.35.0,0.36.0', or a "
+    "range expression resolved against the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is "
+    "all released versions of the SDK from 0.30.0 upwards.",
 )
 @click.option(
     "--child-versions",
     type=str,
     default=None,
     show_default=True,
-    help="A comma-separated list of child versions to test (i.e. process questions in) e.g. '0.35.0,0.36.0'. The "
-    "default is all versions of the SDK from 0.16.0 upwards.",
+    help="A comma-separated list of child versions to test (i.e. process questions in) e.g. '0.35.0,0.36.0', or a "
+    "range expression resolved against the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is "
+    "all released versions of the SDK from 0.30.0 upwards.",
 )
 @click.option(
     "--untagged-child-version-branches",
@@ -147,6 +128,109 @@ def record_questions(octue_sdk_repo_path, parent_versions, questions_file, verbo
     show_default=True,
     help="The path to a JSON file to store the results in.",
 )
+@click.option(
+    "--answers-file",
+    type=click.Path(dir_okay=False),
+    default="recorded_answers.jsonl",
+    show_default=True,
+    help="The path to a JSONL (JSON lines) file to record the children's answers to successfully processed questions "
+    "in. These can be replayed into parents with the `process-answers` command.",
+)
+@click.option(
+    "--performance-file",
+    type=click.Path(dir_okay=False),
+    default="question_performance.json",
+    show_default=True,
+    help="The path to a JSON file to store the time taken to parse and answer each question and the peak memory used, "
+    "grouped by question size class.",
+)
+@click.option(
+    "--results-log",
+    type=click.Path(dir_okay=False),
+    default="version_compatibility_results.log.jsonl",
+    show_default=True,
+    help="The path to a JSONL (JSON lines) file to append the run's events to (e.g. versions being installed and the "
+    "outcome of each parent-child combination as soon as it's known). Follow the run's progress with the `report` "
+    "command.",
+)
+@click.option(
+    "--events-socket",
+    type=str,
+    default=None,
+    help="If given, also send the run's events as JSON datagrams to this local socket for e.g. a dashboard. This can "
+    "be a 'host:port' UDP address or the path to a Unix datagram socket.",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="The maximum number of seconds to let each question take before stopping it and marking it as timed out.",
+)
+@click.option(
+    "--concurrent-questions",
+    type=click.IntRange(min=1),
+    default=None,
+    help="If given, answer each child version's questions with a single child in one worker process with up to this "
+    "many questions in flight at once, instead of starting a worker process per question. A slow or hanging question "
+    "doesn't hold up the others; `--timeout` then applies to each question individually.",
+)
+@click.option(
+    "--cache-directory",
+    type=click.Path(file_okay=False),
+    default=DEFAULT_CACHE_DIRECTORY,
+    show_default=True,
+    help="The directory to cache the outcome of each question in. Questions already processed in an identical child "
+    "environment (the same source tree, lockfile, and worker scripts) aren't processed again, so only the questions "
+    "affected by e.g. a push to an untagged version's branch are re-run.",
+)
+@click.option(
+    "--max-cache-size",
+    type=float,
+    default=DEFAULT_MAX_CACHE_SIZE / 1024**2,
+    show_default=True,
+    help="The maximum size of the outcome cache in megabytes. The least recently used outcomes are evicted first.",
+)
+@click.option(
+    "--snapshots-directory",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="If given, store each child version's installed environment in this directory as an immutable snapshot and "
+    "reuse it instead of installing the version again. Working environments are materialised from snapshots by "
+    "reflinking or hardlinking, so they take seconds to create and almost no disk space.",
+)
+@click.option(
+    "--no-cache",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, don't use or update the outcome cache.",
+)
+@click.option(
+    "--shard",
+    type=str,
+    default=None,
+    help="Only process the given shard of the child versions in the form 'i/N' (e.g. '2/4') so the matrix can be split "
+    "between N runners. Each shard installs only its own child versions.",
+)
+@click.option(
+    "--predict",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, probe each child version once to find which question keys it requires and whether it tolerates "
+    "unknown keys, then skip processing the questions whose shapes predict they're incompatible (e.g. they're missing "
+    "a key the child appears to require). All other questions are still processed. Predicted outcomes have no "
+    "performance measurements or answers.",
+)
+@click.option(
+    "--predictions-file",
+    type=click.Path(dir_okay=False),
+    default="predicted_results.json",
+    show_default=True,
+    help="The path to a JSON file to record the questions skipped with `--predict` in, in the same format as the "
+    "results file. It's emptied at the start of each run. Results in the results file that also appear here were "
+    "predicted to be incompatible rather than processed.",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -162,22 +246,32 @@ def process_questions(
     untagged_child_version_branches,
     questions_file,
     results_file,
+    answers_file,
+    performance_file,
+    results_log,
+    events_socket,
+    timeout,
+    concurrent_questions,
+    cache_directory,
+    max_cache_size,
+    snapshots_directory,
+    no_cache,
+    shard,
+    predict,
+    predictions_file,
     verbose,
 ):
     """Attempt to process each question from the questions file in a child running each specified version of the Octue
     SDK. Each parent-child version combination is marked as compatible if processing succeeds or incompatible if
     processing fails. The results are stored in a JSON file.
     """
-    parent_versions = parse_versions_or_get_defaults(parent_versions)
-    child_versions = parse_versions_or_get_defaults(child_versions)
+    parent_versions = parse_versions_or_get_defaults(parent_versions, octue_sdk_repo_path)
+    child_versions = parse_versions_or_get_defaults(child_versions, octue_sdk_repo_path)
 
-    if untagged_child_version_branches:
-        raw_untagged_child_version_branches = untagged_child_version_branches.split(",")
-        untagged_child_version_branches = {}
+    if shard:
+        child_versions = select_shard(child_versions, shard)
 
-        for element in raw_untagged_child_version_branches:
-            version, branch = element.split("=")
-            untagged_child_version_branches[version] = branch
+    configure_event_stream(events_file_path=os.path.abspath(results_log), events_socket_address=events_socket)
 
     process_questions_across_versions(
         octue_sdk_repo_path=octue_sdk_repo_path,
@@ -185,20 +279,637 @@ def process_questions(
         child_versions=child_versions,
         recording_file_path=os.path.abspath(questions_file),
         results_file_path=os.path.abspath(os.path.join(os.getcwd(), results_file)),
-        untagged_child_version_branches=untagged_child_version_branches,
+        untagged_child_version_branches=parse_untagged_version_branches(untagged_child_version_branches),
+        answers_file_path=os.path.abspath(answers_file),
+        performance_file_path=os.path.abspath(performance_file),
+        timeout=timeout,
+        concurrent_questions=concurrent_questions,
+        outcome_cache=get_outcome_cache(cache_directory, max_cache_size, no_cache),
+        snapshots_directory=os.path.abspath(snapshots_directory) if snapshots_directory else None,
+        predict=predict,
+        predictions_file_path=os.path.abspath(predictions_file) if predict else None,
         verbose=verbose,
     )
 
 
-def parse_versions_or_get_defaults(versions):
-    """Parse a comma-separated string of semantic versions to a list or get the default versions if none are given.
+@octue_compatibility_cli.command()
+@click.option(
+    "--questions-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default="recorded_questions.jsonl",
+    show_default=True,
+    help="The path to the JSONL (JSON lines) file containing the recorded questions.",
+)
+@click.option(
+    "--shapes-file",
+    type=click.Path(dir_okay=False),
+    default="question_shapes.json",
+    show_default=True,
+    help="The path to a JSON file to store the question shapes in.",
+)
+def question_shapes(questions_file, shapes_file):
+    """Extract the shape of the question each parent version emits from the recorded questions without running
+    anything. Each shape maps the path of every key in the question's attributes and data (including its input manifest)
+    to the type of its value, so changes like a renamed manifest field can be seen by comparing versions' shapes.
+    """
+    shapes = get_question_shapes(questions_file)
 
-    :param str|None versions: a comma-separated str of semantic versions
+    with open(shapes_file, "w") as f:
+        json.dump(shapes, f, indent=2)
+
+    print(f"Saved the question shapes of {len(shapes)} versions to {shapes_file!r}.")
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--octue-sdk-repo-path",
+    type=click.Path(file_okay=False, exists=True),
+    default=".",
+    show_default=True,
+    help="The path to a local clone of the `octue-sdk-python` repository.",
+)
+@click.option(
+    "--parent-versions",
+    type=str,
+    default=None,
+    help="A comma-separated list of parent versions to test (i.e. process answers in) e.g. '0.35.0,0.36.0', or a "
+    "range expression resolved against the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is "
+    "all released versions of the SDK from 0.30.0 upwards.",
+)
+@click.option(
+    "--child-versions",
+    type=str,
+    default=None,
+    help="A comma-separated list of child versions to test (i.e. process answers from) e.g. '0.35.0,0.36.0', or a "
+    "range expression resolved against the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is "
+    "all released versions of the SDK from 0.30.0 upwards.",
+)
+@click.option(
+    "--answers-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default="recorded_answers.jsonl",
+    show_default=True,
+    help="The path to the JSONL (JSON lines) file containing answers recorded by the `process-questions` command.",
+)
+@click.option(
+    "--results-file",
+    type=click.Path(dir_okay=False),
+    default="answer_compatibility_results.json",
+    show_default=True,
+    help="The path to a JSON file to store the results in.",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, show all shell output.",
+)
+def process_answers(octue_sdk_repo_path, parent_versions, child_versions, answers_file, results_file, verbose):
+    """Attempt to process each answer from the answers file in a parent running each specified version of the Octue
+    SDK. Each parent-child version combination is marked as compatible if processing succeeds or incompatible if
+    processing fails. The results are stored in a JSON file with the same layout as the `process-questions` results.
+    """
+    parent_versions = parse_versions_or_get_defaults(parent_versions, octue_sdk_repo_path)
+    child_versions = parse_versions_or_get_defaults(child_versions, octue_sdk_repo_path)
+
+    process_answers_across_versions(
+        octue_sdk_repo_path=octue_sdk_repo_path,
+        parent_versions=parent_versions,
+        child_versions=child_versions,
+        answers_file_path=os.path.abspath(answers_file),
+        results_file_path=os.path.abspath(os.path.join(os.getcwd(), results_file)),
+        verbose=verbose,
+    )
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--octue-sdk-repo-path",
+    type=click.Path(file_okay=False, exists=True),
+    default=".",
+    show_default=True,
+    help="The path to a local clone of the `octue-sdk-python` repository.",
+)
+@click.option(
+    "--shared-directory",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="A directory accessible to all workers (e.g. a network file system mount) to write the work manifest to.",
+)
+@click.option(
+    "--parent-versions",
+    type=str,
+    default=None,
+    help="A comma-separated list of parent versions to test (i.e. process questions from) e.g. '0.35.0,0.36.0', or a "
+    "range expression resolved against the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is "
+    "all released versions of the SDK from 0.30.0 upwards.",
+)
+@click.option(
+    "--child-versions",
+    type=str,
+    default=None,
+    help="A comma-separated list of child versions to test (i.e. process questions in) e.g. '0.35.0,0.36.0', or a "
+    "range expression resolved against the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is "
+    "all released versions of the SDK from 0.30.0 upwards.",
+)
+@click.option(
+    "--untagged-child-version-branches",
+    type=str,
+    default=None,
+    help="A comma-separated list of untagged child versions mapped to their branches e.g. '0.53.0=my-branch'.",
+)
+@click.option(
+    "--questions-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default="recorded_questions.jsonl",
+    show_default=True,
+    help="The path to the JSONL (JSON lines) file containing recorded questions from different Octue SDK versions.",
+)
+def create_work(
+    octue_sdk_repo_path,
+    shared_directory,
+    parent_versions,
+    child_versions,
+    untagged_child_version_branches,
+    questions_file,
+):
+    """Create a work manifest in a shared directory so the question processing matrix can be split between workers on
+    separate machines (see the `work` command). There's one unit of work per child version so each worker installs each
+    version at most once.
+    """
+    manifest = create_work_manifest(
+        shared_directory=shared_directory,
+        parent_versions=parse_versions_or_get_defaults(parent_versions, octue_sdk_repo_path),
+        child_versions=parse_versions_or_get_defaults(child_versions, octue_sdk_repo_path),
+        recording_file_path=questions_file,
+        untagged_child_version_branches=parse_untagged_version_branches(untagged_child_version_branches),
+    )
+
+    print(f"Created {len(manifest['units'])} units of work in {shared_directory!r}.")
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--octue-sdk-repo-path",
+    type=click.Path(file_okay=False, exists=True),
+    default=".",
+    show_default=True,
+    help="The path to a local clone of the `octue-sdk-python` repository.",
+)
+@click.option(
+    "--shared-directory",
+    type=click.Path(file_okay=False, exists=True),
+    required=True,
+    help="The shared directory containing the work manifest created by the `create-work` command.",
+)
+@click.option(
+    "--worker-id",
+    type=str,
+    default=None,
+    help="An identifier for this worker. The default is the hostname and process ID.",
+)
+@click.option(
+    "--cache-directory",
+    type=click.Path(file_okay=False),
+    default=DEFAULT_CACHE_DIRECTORY,
+    show_default=True,
+    help="The directory to cache the outcome of each question in. Questions already processed in an identical child "
+    "environment (the same source tree, lockfile, and worker scripts) aren't processed again, so only the questions "
+    "affected by e.g. a push to an untagged version's branch are re-run.",
+)
+@click.option(
+    "--max-cache-size",
+    type=float,
+    default=DEFAULT_MAX_CACHE_SIZE / 1024**2,
+    show_default=True,
+    help="The maximum size of the outcome cache in megabytes. The least recently used outcomes are evicted first.",
+)
+@click.option(
+    "--snapshots-directory",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="If given, store each child version's installed environment in this directory as an immutable snapshot and "
+    "reuse it instead of installing the version again. Working environments are materialised from snapshots by "
+    "reflinking or hardlinking, so they take seconds to create and almost no disk space.",
+)
+@click.option(
+    "--no-cache",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, don't use or update the outcome cache.",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, show all shell output.",
+)
+def work(
+    octue_sdk_repo_path,
+    shared_directory,
+    worker_id,
+    cache_directory,
+    max_cache_size,
+    snapshots_directory,
+    no_cache,
+    verbose,
+):
+    """Claim and process units of work from the work manifest in the shared directory until none are left. Any number
+    of workers can run at once on any number of machines. The results of each unit are written to a fragment in the
+    shared directory; combine them with the `merge-results` command.
+    """
+    processed_unit_ids = run_worker(
+        shared_directory=shared_directory,
+        octue_sdk_repo_path=octue_sdk_repo_path,
+        worker_id=worker_id,
+        outcome_cache=get_outcome_cache(cache_directory, max_cache_size, no_cache),
+        snapshots_directory=os.path.abspath(snapshots_directory) if snapshots_directory else None,
+        verbose=verbose,
+    )
+
+    print(f"No units of work left. This worker processed {len(processed_unit_ids)} units.")
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--shared-directory",
+    type=click.Path(file_okay=False, exists=True),
+    required=True,
+    help="The shared directory containing the work manifest and result fragments.",
+)
+@click.option(
+    "--results-file",
+    type=click.Path(dir_okay=False),
+    default="version_compatibility_results.json",
+    show_default=True,
+    help="The path to a JSON file to merge the results into.",
+)
+@click.option(
+    "--answers-file",
+    type=click.Path(dir_okay=False),
+    default="recorded_answers.jsonl",
+    show_default=True,
+    help="The path to a JSONL (JSON lines) file to append the answers recorded by the workers to.",
+)
+@click.option(
+    "--performance-file",
+    type=click.Path(dir_okay=False),
+    default="question_performance.json",
+    show_default=True,
+    help="The path to a JSON file to merge the performance measurements recorded by the workers into.",
+)
+def merge_results(shared_directory, results_file, answers_file, performance_file):
+    """Merge the result fragments written by workers into the standard results JSON file."""
+    missing_unit_ids, failed_units = merge_result_fragments(
+        shared_directory,
+        results_file,
+        answers_file_path=answers_file,
+        performance_file_path=performance_file,
+    )
+
+    for unit_id, error in failed_units.items():
+        print(f"Unit {unit_id} failed: {error}")
+
+    if missing_unit_ids:
+        print(f"Results are missing for {len(missing_unit_ids)} units: {', '.join(missing_unit_ids)}.")
+    elif failed_units:
+        print(f"Results merged into {results_file!r}, but {len(failed_units)} units failed.")
+    else:
+        print(f"All results merged into {results_file!r}.")
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--octue-sdk-repo-path",
+    type=click.Path(file_okay=False, exists=True),
+    default=".",
+    show_default=True,
+    help="The path to a local clone of the `octue-sdk-python` repository.",
+)
+@click.option(
+    "--candidate-branch",
+    type=str,
+    required=True,
+    help="The branch of the `octue-sdk-python` repository containing the release candidate.",
+)
+@click.option(
+    "--candidate-version",
+    type=str,
+    default=None,
+    help="The release candidate's version. The default is the version in the branch's `pyproject.toml` file.",
+)
+@click.option(
+    "--released-versions",
+    type=str,
+    default=DEFAULT_RELEASED_VERSIONS_EXPRESSION,
+    show_default=True,
+    help="A comma-separated list of released versions to test the candidate against, or a range expression resolved "
+    "against the repository's tags e.g. '>=0.40,latest-minor-only'.",
+)
+@click.option(
+    "--questions-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default="recorded_questions.jsonl",
+    show_default=True,
+    help="The path to the JSONL (JSON lines) file containing questions recorded from the released versions.",
+)
+@click.option(
+    "--baseline-results-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default="version_compatibility_results.json",
+    show_default=True,
+    help="The path to the results file of a full run of the `process-questions` command to compare the candidate's "
+    "results with.",
+)
+@click.option(
+    "--results-file",
+    type=click.Path(dir_okay=False),
+    default="candidate_compatibility_results.json",
+    show_default=True,
+    help="The path to a JSON file to store the candidate's results in.",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="The maximum number of seconds to let each question take before stopping it and marking it as timed out.",
+)
+@click.option(
+    "--concurrent-questions",
+    type=click.IntRange(min=1),
+    default=None,
+    help="If given, answer each child version's questions with a single child in one worker process with up to this "
+    "many questions in flight at once.",
+)
+@click.option(
+    "--cache-directory",
+    type=click.Path(file_okay=False),
+    default=DEFAULT_CACHE_DIRECTORY,
+    show_default=True,
+    help="The directory to cache the outcome of each question in.",
+)
+@click.option(
+    "--snapshots-directory",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="If given, store each version's installed environment in this directory as an immutable snapshot and reuse it "
+    "instead of installing the version again.",
+)
+@click.option(
+    "--no-cache",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, don't use or update the outcome cache.",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, show all shell output.",
+)
+def check_candidate(
+    octue_sdk_repo_path,
+    candidate_branch,
+    candidate_version,
+    released_versions,
+    questions_file,
+    baseline_results_file,
+    results_file,
+    timeout,
+    concurrent_questions,
+    cache_directory,
+    snapshots_directory,
+    no_cache,
+    verbose,
+):
+    """Check whether a release candidate on a branch breaks compatibility with released versions of the Octue SDK. The
+    candidate is tested as both a child and a parent of the latest patch of each released minor version and the results
+    are compared with the latest released version's results in the baseline results file. Exit with a non-zero code
+    only if there are new incompatibilities.
+    """
+    comparison = run_candidate_check(
+        octue_sdk_repo_path=octue_sdk_repo_path,
+        candidate_branch=candidate_branch,
+        recording_file_path=os.path.abspath(questions_file),
+        baseline_results_file_path=os.path.abspath(baseline_results_file),
+        results_file_path=os.path.abspath(results_file),
+        candidate_version=candidate_version,
+        released_versions_expression=released_versions,
+        timeout=timeout,
+        concurrent_questions=concurrent_questions,
+        outcome_cache=get_outcome_cache(cache_directory, DEFAULT_MAX_CACHE_SIZE / 1024**2, no_cache),
+        snapshots_directory=os.path.abspath(snapshots_directory) if snapshots_directory else None,
+        verbose=verbose,
+    )
+
+    for parent_version, child_version in comparison["known_incompatibilities"]:
+        print(f"Known incompatibility: parent {parent_version} -> child {child_version}.")
+
+    if not comparison["new_incompatibilities"]:
+        print("No new incompatibilities found.")
+        return
+
+    for parent_version, child_version in comparison["new_incompatibilities"]:
+        print(f"NEW INCOMPATIBILITY: parent {parent_version} -> child {child_version}.")
+
+    sys.exit(1)
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--results-log",
+    type=click.Path(dir_okay=False),
+    default="version_compatibility_results.log.jsonl",
+    show_default=True,
+    help="The path to the results log written by the `process-questions` command.",
+)
+@click.option(
+    "--html-file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="If given, also render the matrix to this static HTML file on each refresh.",
+)
+@click.option(
+    "--follow/--no-follow",
+    default=True,
+    show_default=True,
+    help="Keep refreshing the report as results come in until the run finishes.",
+)
+@click.option(
+    "--refresh-interval",
+    type=float,
+    default=2,
+    show_default=True,
+    help="The number of seconds between checks for new results when following.",
+)
+def report(results_log, html_file, follow, refresh_interval):
+    """Render the parent-child compatibility matrix of the latest run as a coloured terminal table and, optionally, a
+    static HTML file, along with the run's progress and estimated time remaining. The results log is tailed so the
+    report can be followed while a run is in progress.
+    """
+    report_results(results_log, html_file_path=html_file, follow=follow, refresh_interval=refresh_interval)
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--performance-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default="question_performance.json",
+    show_default=True,
+    help="The path to the performance file produced by the `process-questions` command.",
+)
+@click.option(
+    "--size-class",
+    type=str,
+    default="default",
+    show_default=True,
+    help="The question size class to create the matrix for.",
+)
+@click.option(
+    "--matrix-file",
+    type=click.Path(dir_okay=False),
+    default="performance_matrix.json",
+    show_default=True,
+    help="The path to a JSON file to store the matrix in.",
+)
+def performance_matrix(performance_file, size_class, matrix_file):
+    """Create heat-map-ready matrices of the wall time, CPU time, and peak memory (plus parse and answer times) of each
+    parent-child version combination from the performance file. The rows and columns match the compatibility matrix.
+    Each metric is also given relative to the best measurement in its row.
+    """
+    matrix = create_performance_matrix(performance_file, size_class=size_class)
+
+    with open(matrix_file, "w") as f:
+        json.dump(matrix, f, indent=2)
+
+    print(f"Saved {len(matrix['parents'])}x{len(matrix['children'])} performance matrix to {matrix_file!r}.")
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--octue-sdk-repo-path",
+    type=click.Path(file_okay=False, exists=True),
+    default=".",
+    show_default=True,
+    help="The path to a local clone of the `octue-sdk-python` repository.",
+)
+@click.option(
+    "--versions",
+    type=str,
+    default=None,
+    help="A comma-separated list of versions to measure e.g. '0.35.0,0.36.0', or a range expression resolved against "
+    "the repository's tags e.g. '>=0.40,<0.50,latest-minor-only'. The default is all released versions of the SDK "
+    "from 0.30.0 upwards.",
+)
+@click.option(
+    "--report-file",
+    type=click.Path(dir_okay=False),
+    default="import_times.json",
+    show_default=True,
+    help="The path to a JSON file to store the report in.",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="If provided, show all shell output.",
+)
+def import_times(octue_sdk_repo_path, versions, report_file, verbose):
+    """Measure how long the worker scripts take to import their dependencies in each of the given Octue SDK versions.
+    This is the startup cost of every worker process. The report includes the most expensive top-level packages.
+    """
+    measure_import_times_across_versions(
+        octue_sdk_repo_path=octue_sdk_repo_path,
+        versions=parse_versions_or_get_defaults(versions, octue_sdk_repo_path),
+        report_file_path=os.path.abspath(report_file),
+        verbose=verbose,
+    )
+
+
+@octue_compatibility_cli.command()
+@click.option(
+    "--address",
+    type=str,
+    default="localhost:7701",
+    show_default=True,
+    help="The address to serve the broker at. This can be a 'host:port' TCP address or the path to a Unix socket.",
+)
+@click.option(
+    "--ack-deadline",
+    type=float,
+    default=60,
+    show_default=True,
+    help="The number of seconds a pulled message has to be acknowledged in before it's redelivered.",
+)
+def serve_broker(address, ack_deadline):
+    """Serve a mock Pub/Sub broker that parents and children running different versions of the Octue SDK in separate
+    processes can communicate through. Point the `serve_child.py` and `ask_question.py` scripts at it by setting the
+    `OCTUE_MOCK_BROKER_ADDRESS` environment variable to the same address. One broker can serve any number of
+    parent-child pairs at once.
+    """
+    server = create_broker_server(address, ack_deadline=ack_deadline)
+    print(f"Serving mock Pub/Sub broker at {address!r}. Press Ctrl+C to stop.")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_versions_or_get_defaults(versions, octue_sdk_repo_path):
+    """Parse a comma-separated string of semantic versions or a range expression to a list or get the default versions
+    if none are given. Range expressions are resolved against the tags of the given repository.
+
+    :param str|None versions: a comma-separated str of semantic versions and/or range expressions
+    :param str octue_sdk_repo_path: the path to a local clone of the `octue-sdk-python` repository
     :return list(str):
     """
-    if versions:
-        return versions.split(",")
-    return VERSIONS_TO_CHECK
+    return resolve_versions(versions, octue_sdk_repo_path)
+
+
+def get_outcome_cache(cache_directory, max_cache_size, no_cache):
+    """Get the outcome cache to use unless caching is turned off.
+
+    :param str cache_directory:
+    :param float max_cache_size: the maximum size of the cache in megabytes
+    :param bool no_cache: if `True`, don't use a cache
+    :return inter_service_compatibility.outcome_cache.OutcomeCache|None:
+    """
+    if no_cache:
+        return None
+
+    return OutcomeCache(os.path.abspath(cache_directory), max_size=int(max_cache_size * 1024**2))
+
+
+def parse_untagged_version_branches(untagged_version_branches):
+    """Parse a comma-separated string of untagged versions mapped to their branches (e.g. "0.53.0=my-branch") to a
+    dictionary.
+
+    :param str|None untagged_version_branches:
+    :return dict|None:
+    """
+    if not untagged_version_branches:
+        return None
+
+    parsed_untagged_version_branches = {}
+
+    for element in untagged_version_branches.split(","):
+        version, branch = element.split("=")
+        parsed_untagged_version_branches[version] = branch
+
+    return parsed_untagged_version_branches
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+import importlib.metadata
+import json
+import os
+import sys
+import tempfile
+
+from utils import ServicePatcher
+
+
+def ask_question(pair_name, answer_file_path, timeout=600):
+    """Ask a question from a parent running the current version of `octue` to the child in the same pair (see
+    `serve_child.py`) through the broker at the address in the `OCTUE_MOCK_BROKER_ADDRESS` environment variable. The
+    child and parent can be running different versions of `octue` in different processes. Log and monitor messages from
+    the child are handled by the parent as usual and the answer is written to the given file.
+
+    :param str pair_name: a name shared by the parent and child that's unique among the pairs using the broker
+    :param str answer_file_path: the path to a JSON file to write the answer to
+    :param float timeout: the maximum number of seconds to wait for the child to start and then for it to answer
+    :raise TimeoutError: if the child doesn't start in time
+    :return None:
+    """
+    from serve_child import get_rendezvous_topic_name
+
+    from mocks import MESSAGES, MockService
+    from octue.resources import Manifest
+    from octue.resources.service_backends import GCPPubSubBackend
+    from octue.utils.encoders import OctueJSONEncoder
+
+    if isinstance(MESSAGES, dict):
+        raise EnvironmentError("The `OCTUE_MOCK_BROKER_ADDRESS` environment variable must be set to ask a question.")
+
+    # Wait for the child to start and publish its service ID.
+    rendezvous_topic_name = get_rendezvous_topic_name(pair_name)
+    MESSAGES.client.create_topic(rendezvous_topic_name)
+    rendezvous_message = MESSAGES.client.pull(rendezvous_topic_name, wait=timeout)
+
+    if rendezvous_message is None:
+        raise TimeoutError(f"The child for pair {pair_name!r} didn't start within {timeout} seconds.")
+
+    child_id, _, ack_id = rendezvous_message
+    child_id = child_id.decode()
+    MESSAGES.acknowledge([ack_id])
+
+    parent = MockService(backend=GCPPubSubBackend(project_name="my-project"))
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        os.mkdir(os.path.join(temporary_directory, "path-within-dataset"))
+
+        datafile_0_path = os.path.join(temporary_directory, "path-within-dataset", "a_test_file.csv")
+        with open(datafile_0_path, "w") as f:
+            f.write("blah")
+
+        datafile_1_path = os.path.join(temporary_directory, "path-within-dataset", "another_test_file.csv")
+        with open(datafile_1_path, "w") as f:
+            f.write("blah")
+
+        input_manifest = Manifest(datasets={"my_dataset": temporary_directory})
+
+        with ServicePatcher():
+            subscription, _ = parent.ask(
+                child_id,
+                input_values={"height": 4, "width": 72},
+                input_manifest=input_manifest,
+                allow_local_files=True,
+            )
+
+            answer = parent.wait_for_answer(subscription, timeout=timeout)
+
+    with open(answer_file_path, "w") as f:
+        json.dump(
+            {"parent_sdk_version": importlib.metadata.version("octue"), "answer": answer}, f, cls=OctueJSONEncoder
+        )
+
+
+if __name__ == "__main__":
+    pair_name, answer_file_path = sys.argv[1:3]
+
+    print(f"Asking question for pair {pair_name!r}...")
+    ask_question(pair_name, answer_file_path)
@@ -0,0 +1,433 @@
+"""A minimal local stand-in for Google Pub/Sub that lets services in different processes (and so different virtual
+environments running different versions of `octue`) exchange messages. The broker holds one queue per topic and
+supports publishing, pulling (with an acknowledgement deadline), and acknowledging messages. Requests and responses are
+newline-delimited JSON sent over a TCP or Unix socket.
+
+This module only uses the standard library so it can be imported by the worker scripts whatever version of `octue` is
+installed.
+"""
+
+import base64
+import collections
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+BROKER_ADDRESS_ENVIRONMENT_VARIABLE = "OCTUE_MOCK_BROKER_ADDRESS"
+DEFAULT_ACK_DEADLINE = 60
+DEFAULT_PULL_WAIT = 0.5
+
+
+class MockBroker:
+    """A thread-safe register of topics and their messages. Any number of publishers and subscribers can use one broker
+    at the same time - topics are independent of each other, so many parent-child pairs can be served by one instance.
+
+    :param float ack_deadline: the number of seconds a pulled message has to be acknowledged in before it's redelivered
+    :return None:
+    """
+
+    def __init__(self, ack_deadline=DEFAULT_ACK_DEADLINE):
+        self.ack_deadline = ack_deadline
+        self._topics = {}
+        self._leases = {}
+        self._condition = threading.Condition()
+
+    def create_topic(self, topic, allow_existing=True):
+        """Create a topic if it doesn't already exist.
+
+        :param str topic:
+        :param bool allow_existing: if `False`, raise an error if the topic already exists
+        :raise ValueError: if the topic already exists and `allow_existing` is `False`
+        :return None:
+        """
+        with self._condition:
+            if topic in self._topics:
+                if not allow_existing:
+                    raise ValueError(f"Topic {topic!r} already exists.")
+                return
+
+            self._topics[topic] = collections.deque()
+
+    def delete_topic(self, topic):
+        """Delete a topic and any unacknowledged messages for it.
+
+        :param str topic:
+        :raise KeyError: if the topic doesn't exist
+        :return None:
+        """
+        with self._condition:
+            del self._topics[topic]
+
+            for ack_id in [ack_id for ack_id, lease in self._leases.items() if lease[0] == topic]:
+                del self._leases[ack_id]
+
+    def topic_exists(self, topic):
+        """Check if a topic exists.
+
+        :param str topic:
+        :return bool:
+        """
+        with self._condition:
+            return topic in self._topics
+
+    def publish(self, topic, message):
+        """Add a message to the end of a topic's queue.
+
+        :param str topic:
+        :param dict message: a serialised message with "data" and "attributes" keys
+        :raise KeyError: if the topic doesn't exist
+        :return None:
+        """
+        with self._condition:
+            self._topics[topic].append(message)
+            self._condition.notify_all()
+
+    def list_messages(self, topic):
+        """Get the messages waiting in a topic's queue without leasing them.
+
+        :param str topic:
+        :raise KeyError: if the topic doesn't exist
+        :return list(dict): the serialised messages in the order they were published
+        """
+        with self._condition:
+            return list(self._topics[topic])
+
+    def pull(self, topic, wait=0):
+        """Lease the next message from a topic's queue. If the message isn't acknowledged within the acknowledgement
+        deadline, it's put back at the front of the queue.
+
+        :param str topic:
+        :param float wait: the maximum number of seconds to wait for a message if the queue is empty
+        :raise KeyError: if the topic doesn't exist
+        :return dict|None: the message with an added "ack_id" key, or `None` if there are no messages
+        """
+        end_time = time.monotonic() + wait
+
+        with self._condition:
+            while True:
+                self._redeliver_expired_messages()
+
+                if self._topics[topic]:
+                    message = self._topics[topic].popleft()
+                    ack_id = str(uuid.uuid4())
+                    self._leases[ack_id] = (topic, message, time.monotonic() + self.ack_deadline)
+                    return {**message, "ack_id": ack_id}
+
+                remaining = end_time - time.monotonic()
+
+                if remaining <= 0:
+                    return None
+
+                self._condition.wait(min(remaining, self.ack_deadline))
+
+    def acknowledge(self, ack_ids):
+        """Acknowledge leased messages so they aren't redelivered. Unknown acknowledgement IDs are ignored.
+
+        :param iter(str) ack_ids:
+        :return None:
+        """
+        with self._condition:
+            for ack_id in ack_ids:
+                self._leases.pop(ack_id, None)
+
+    def _redeliver_expired_messages(self):
+        """Put messages whose acknowledgement deadline has passed back at the front of their topics' queues.
+
+        :return None:
+        """
+        now = time.monotonic()
+
+        for ack_id, (topic, message, deadline) in list(self._leases.items()):
+            if deadline > now:
+                continue
+
+            del self._leases[ack_id]
+
+            if topic in self._topics:
+                self._topics[topic].appendleft(message)
+
+
+class _BrokerRequestHandler(socketserver.StreamRequestHandler):
+    """Handle newline-delimited JSON requests from a `BrokerClient` for the lifetime of its connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = {"result": self._dispatch(request)}
+            except KeyError as error:
+                response = {"error": "KeyError", "message": error.args[0] if error.args else str(error)}
+            except Exception as error:  # noqa
+                response = {"error": type(error).__name__, "message": str(error)}
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+    def _dispatch(self, request):
+        broker = self.server.broker
+        action = request["action"]
+
+        if action == "create_topic":
+            return broker.create_topic(request["topic"], allow_existing=request.get("allow_existing", True))
+        if action == "delete_topic":
+            return broker.delete_topic(request["topic"])
+        if action == "topic_exists":
+            return broker.topic_exists(request["topic"])
+        if action == "publish":
+            return broker.publish(request["topic"], request["message"])
+        if action == "list_messages":
+            return broker.list_messages(request["topic"])
+        if action == "pull":
+            return broker.pull(request["topic"], wait=request.get("wait", 0))
+        if action == "acknowledge":
+            return broker.acknowledge(request["ack_ids"])
+
+        raise ValueError(f"Unknown broker action {action!r}.")
+
+
+class _ThreadingTCPBrokerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class _ThreadingUnixBrokerServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def parse_broker_address(address):
+    """Parse a broker address into a socket family and address. Addresses of the form "host:port" are TCP addresses;
+    anything else is treated as the path to a Unix socket.
+
+    :param str address:
+    :return (int, str|tuple(str, int)):
+    """
+    host, separator, port = address.rpartition(":")
+
+    if separator and port.isdigit():
+        return socket.AF_INET, (host or "localhost", int(port))
+
+    return socket.AF_UNIX, address
+
+
+def create_broker_server(address, ack_deadline=DEFAULT_ACK_DEADLINE):
+    """Create a socket server wrapping a new `MockBroker` at the given address. Call `serve_forever` on the result to
+    start serving.
+
+    :param str address: a "host:port" TCP address or the path to a Unix socket
+    :param float ack_deadline: the number of seconds a pulled message has to be acknowledged in before it's redelivered
+    :return socketserver.BaseServer:
+    """
+    family, parsed_address = parse_broker_address(address)
+
+    if family == socket.AF_INET:
+        server = _ThreadingTCPBrokerServer(parsed_address, _BrokerRequestHandler)
+    else:
+        if os.path.exists(parsed_address):
+            os.remove(parsed_address)
+
+        server = _ThreadingUnixBrokerServer(parsed_address, _BrokerRequestHandler)
+
+    server.broker = MockBroker(ack_deadline=ack_deadline)
+    return server
+
+
+class BrokerClient:
+    """A client for a broker served by `create_broker_server`. One connection is kept open per client and shared
+    between threads.
+
+    :param str address: a "host:port" TCP address or the path to a Unix socket
+    :return None:
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._socket = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def create_topic(self, topic, allow_existing=True):
+        return self._request(action="create_topic", topic=topic, allow_existing=allow_existing)
+
+    def delete_topic(self, topic):
+        return self._request(action="delete_topic", topic=topic)
+
+    def topic_exists(self, topic):
+        return self._request(action="topic_exists", topic=topic)
+
+    def publish(self, topic, data, attributes):
+        """Publish a message to a topic.
+
+        :param str topic:
+        :param bytes|str data:
+        :param dict attributes:
+        :return None:
+        """
+        if isinstance(data, str):
+            data = data.encode()
+
+        message = {"data": base64.b64encode(data).decode(), "attributes": attributes}
+        return self._request(action="publish", topic=topic, message=message)
+
+    def list_messages(self, topic):
+        """Get the messages waiting in a topic without leasing them.
+
+        :param str topic:
+        :return list(tuple(bytes, dict)): the data and attributes of each message
+        """
+        messages = self._request(action="list_messages", topic=topic)
+        return [(base64.b64decode(message["data"]), message["attributes"]) for message in messages]
+
+    def pull(self, topic, wait=0):
+        """Lease the next message from a topic.
+
+        :param str topic:
+        :param float wait: the maximum number of seconds to wait for a message if there isn't one available
+        :return (bytes, dict, str)|None: the message data, attributes, and acknowledgement ID, or `None` if there are no messages
+        """
+        message = self._request(action="pull", topic=topic, wait=wait)
+
+        if message is None:
+            return None
+
+        return base64.b64decode(message["data"]), message["attributes"], message["ack_id"]
+
+    def acknowledge(self, ack_ids):
+        return self._request(action="acknowledge", ack_ids=list(ack_ids))
+
+    def close(self):
+        with self._lock:
+            if self._socket:
+                self._file.close()
+                self._socket.close()
+                self._socket = None
+                self._file = None
+
+    def _connect(self):
+        family, parsed_address = parse_broker_address(self.address)
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.connect(parsed_address)
+        self._file = self._socket.makefile("rwb")
+
+    def _request(self, **request):
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+
+            self._file.write(json.dumps(request).encode() + b"\n")
+            self._file.flush()
+            response = json.loads(self._file.readline())
+
+        if "error" not in response:
+            return response["result"]
+
+        if response["error"] == "KeyError":
+            raise KeyError(response["message"])
+
+        raise ChildProcessError(f"Broker request failed with {response['error']}: {response['message']}")
+
+
+class BrokerMessages:
+    """A view of a broker with the same interface as the global messages dictionary in `mocks`, so the mocks can use a
+    broker without knowing about it. Topics are keys and each value is a `BrokerTopicQueue`. As with the dictionary,
+    setting a topic replaces any messages already in it.
+
+    :param str address: a "host:port" TCP address or the path to a Unix socket
+    :param callable message_class: a callable taking the message data and attributes as keyword arguments
+    :param float pull_wait: the maximum number of seconds to wait for a message when popping from an empty topic
+    :return None:
+    """
+
+    def __init__(self, address, message_class, pull_wait=DEFAULT_PULL_WAIT):
+        self.client = BrokerClient(address)
+        self.message_class = message_class
+        self.pull_wait = pull_wait
+
+    def __getitem__(self, topic):
+        return BrokerTopicQueue(self, topic)
+
+    def __setitem__(self, topic, messages):
+        if self.client.topic_exists(topic):
+            self.client.delete_topic(topic)
+
+        self.client.create_topic(topic)
+
+        for message in messages:
+            self.client.publish(topic, message.data, message.attributes)
+
+    def __delitem__(self, topic):
+        self.client.delete_topic(topic)
+
+    def __contains__(self, topic):
+        return self.client.topic_exists(topic)
+
+    def acknowledge(self, ack_ids):
+        """Acknowledge messages popped from any topic.
+
+        :param iter(str) ack_ids:
+        :return None:
+        """
+        self.client.acknowledge([ack_id for ack_id in ack_ids if ack_id])
+
+
+class BrokerTopicQueue:
+    """A list-like view of a single topic on a broker that supports the `append` and `pop(0)` operations the mocks use.
+    Iterating over it gives the messages waiting in the topic without leasing them (e.g. to record a child's answer).
+
+    :param BrokerMessages messages:
+    :param str topic:
+    :return None:
+    """
+
+    def __init__(self, messages, topic):
+        self.messages = messages
+        self.topic = topic
+
+    def __iter__(self):
+        for data, attributes in self.messages.client.list_messages(self.topic):
+            yield self.messages.message_class(data=data, **attributes)
+
+    def __len__(self):
+        return len(self.messages.client.list_messages(self.topic))
+
+    def append(self, message):
+        self.messages.client.publish(self.topic, message.data, message.attributes)
+
+    def pop(self, index=-1):
+        """Lease the first message in the topic. The returned message has an `ack_id` attribute that should be passed
+        to `BrokerMessages.acknowledge` once it's been handled.
+
+        :param int index: must be `0` - brokers are first-in-first-out
+        :raise IndexError: if there are no messages in the topic
+        :return any: an instance of the message class
+        """
+        if index != 0:
+            raise ValueError("Messages can only be popped from the front of a broker topic.")
+
+        pulled_message = self.messages.client.pull(self.topic, wait=self.messages.pull_wait)
+
+        if pulled_message is None:
+            raise IndexError(f"No messages available in topic {self.topic!r}.")
+
+        data, attributes, ack_id = pulled_message
+        message = self.messages.message_class(data=data, **attributes)
+        message.ack_id = ack_id
+        return message
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    broker_address = sys.argv[1] if len(sys.argv) > 1 else os.environ.get(BROKER_ADDRESS_ENVIRONMENT_VARIABLE)
+    broker_server = create_broker_server(broker_address)
+    logger.info("Serving mock Pub/Sub broker at %r.", broker_address)
+    broker_server.serve_forever()
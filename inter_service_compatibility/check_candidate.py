@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import subprocess
+import tempfile
+
+from .process_questions_across_versions import process_questions_across_versions
+from .record_questions_across_versions import record_questions_across_versions
+from .versions import resolve_versions
+
+
+DEFAULT_RELEASED_VERSIONS_EXPRESSION = "latest-minor-only"
+PYPROJECT_VERSION_PATTERN = re.compile(r'^version\s*=\s*"([^"]+)"', re.MULTILINE)
+
+
+def check_candidate(
+    octue_sdk_repo_path,
+    candidate_branch,
+    recording_file_path,
+    baseline_results_file_path,
+    results_file_path,
+    candidate_version=None,
+    released_versions_expression=DEFAULT_RELEASED_VERSIONS_EXPRESSION,
+    timeout=None,
+    concurrent_questions=None,
+    outcome_cache=None,
+    snapshots_directory=None,
+    verbose=False,
+):
+    """Check whether a release candidate on a branch breaks compatibility with released versions of the Octue SDK.
+    Only the affected cells of the matrix are processed: the candidate is tested as a child of each released version
+    (and itself) and as a parent of each released version. The released versions are the latest patch of each minor
+    version by default.
+
+    The candidate's results are compared with the baseline results of the latest released version - a cell is a new
+    incompatibility if the candidate is incompatible with a released version that the latest released version is
+    compatible with (or that has no baseline result).
+
+    :param str octue_sdk_repo_path:
+    :param str candidate_branch: the branch of the `octue-sdk-python` repository containing the candidate
+    :param str recording_file_path: the path to the JSONL (JSON lines) file containing questions recorded from the released versions
+    :param str baseline_results_file_path: the path to the results file of a full run of `process-questions`
+    :param str results_file_path: the path to a JSON file to store the candidate's results in; this is overwritten
+    :param str|None candidate_version: the candidate's version; if `None`, it's read from the branch's `pyproject.toml` file
+    :param str released_versions_expression: the released versions to test the candidate against (see `versions.resolve_versions`)
+    :param float|None timeout: if given, the maximum number of seconds to let each question take
+    :param int|None concurrent_questions: if given, answer this many questions at once in a single worker process per child version
+    :param inter_service_compatibility.outcome_cache.OutcomeCache|None outcome_cache: if given, reuse cached outcomes and cache new ones in this
+    :param str|None snapshots_directory: if given, store and reuse snapshots of the versions' environments in this directory
+    :param bool verbose:
+    :raise ValueError: if the candidate's version is a released version or no questions from the released versions are found
+    :raise ChildProcessError: if a question can't be recorded from the candidate or a version can't be installed
+    :return dict: the new and known incompatibilities as lists of `(parent_version, child_version)` pairs
+    """
+    octue_sdk_repo_path = os.path.abspath(octue_sdk_repo_path)
+    candidate_version = candidate_version or get_branch_version(octue_sdk_repo_path, candidate_branch)
+    released_versions = resolve_versions(released_versions_expression, octue_sdk_repo_path)
+
+    if candidate_version in released_versions:
+        raise ValueError(
+            f"The candidate's version ({candidate_version}) has already been released. Bump the version on the "
+            f"{candidate_branch!r} branch or pass the candidate's version explicitly."
+        )
+
+    released_questions = []
+
+    with open(recording_file_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            question = json.loads(line)
+
+            # Questions generated for size classes don't affect the compatibility matrix.
+            if question["parent_sdk_version"] in released_versions and not question.get("size_class"):
+                released_questions.append(line)
+
+    if not released_questions:
+        raise ValueError(f"No questions from the versions {released_versions!r} were found in {recording_file_path!r}.")
+
+    # Start from an empty results file so it only contains the candidate's results.
+    if os.path.exists(results_file_path):
+        os.remove(results_file_path)
+
+    processing_options = {
+        "octue_sdk_repo_path": octue_sdk_repo_path,
+        "results_file_path": results_file_path,
+        "timeout": timeout,
+        "concurrent_questions": concurrent_questions,
+        "outcome_cache": outcome_cache,
+        "snapshots_directory": snapshots_directory,
+        "verbose": verbose,
+    }
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        candidate_questions_path = os.path.join(temporary_directory, "candidate_questions.jsonl")
+        questions_path = os.path.join(temporary_directory, "questions.jsonl")
+
+        record_questions_across_versions(
+            octue_sdk_repo_path=octue_sdk_repo_path,
+            parent_versions=[candidate_branch],
+            recording_file_path=candidate_questions_path,
+            verbose=verbose,
+        )
+
+        try:
+            with open(candidate_questions_path) as f:
+                candidate_questions = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            candidate_questions = []
+
+        if not candidate_questions:
+            raise ChildProcessError(
+                f"Recording a question from the candidate on the {candidate_branch!r} branch failed."
+            )
+
+        # The question is recorded with the installed version of `octue`, which differs from the candidate's version if
+        # it was passed explicitly. Label it with the candidate's version so the candidate-as-parent cells aren't skipped.
+        candidate_questions = [
+            json.dumps({**json.loads(question), "parent_sdk_version": candidate_version}) + "\n"
+            for question in candidate_questions
+        ]
+
+        with open(candidate_questions_path, "w") as f:
+            f.writelines(candidate_questions)
+
+        with open(questions_path, "w") as f:
+            f.writelines(released_questions + candidate_questions)
+
+        # Test the candidate as a child of each released version and itself.
+        process_questions_across_versions(
+            parent_versions=released_versions + [candidate_version],
+            child_versions=[candidate_version],
+            recording_file_path=questions_path,
+            untagged_child_version_branches={candidate_version: candidate_branch},
+            **processing_options,
+        )
+
+        # Test the candidate as a parent of each released version.
+        process_questions_across_versions(
+            parent_versions=[candidate_version],
+            child_versions=released_versions,
+            recording_file_path=candidate_questions_path,
+            **processing_options,
+        )
+
+    with open(results_file_path) as f:
+        candidate_results = json.load(f)
+
+    with open(baseline_results_file_path) as f:
+        baseline_results = json.load(f)
+
+    return compare_with_baseline(candidate_results, baseline_results, candidate_version, released_versions)
+
+
+def compare_with_baseline(candidate_results, baseline_results, candidate_version, released_versions):
+    """Compare the candidate's results with the baseline results of the latest released version. The candidate's row
+    and column are compared with the latest released version's row and column, and the candidate's result with itself is
+    compared with the latest released version's result with itself. Cells the candidate has no result for (e.g. because
+    they timed out) are counted as incompatible.
+
+    :param dict candidate_results: results including the candidate's row and column
+    :param dict baseline_results: the results of a full run of `process-questions`
+    :param str candidate_version:
+    :param list(str) released_versions: the released versions the candidate was tested against, newest first
+    :return dict: the new and known incompatibilities as lists of `(parent_version, child_version)` pairs
+    """
+    latest_released_version = released_versions[0]
+    comparison = {"new_incompatibilities": [], "known_incompatibilities": []}
+
+    cells = [(released_version, candidate_version) for released_version in released_versions]
+    cells += [(candidate_version, released_version) for released_version in released_versions]
+    cells.append((candidate_version, candidate_version))
+
+    for parent_version, child_version in cells:
+        if candidate_results.get(parent_version, {}).get(child_version, False):
+            continue
+
+        baseline_parent_version = latest_released_version if parent_version == candidate_version else parent_version
+        baseline_child_version = latest_released_version if child_version == candidate_version else child_version
+
+        if baseline_results.get(baseline_parent_version, {}).get(baseline_child_version, True):
+            comparison["new_incompatibilities"].append((parent_version, child_version))
+        else:
+            comparison["known_incompatibilities"].append((parent_version, child_version))
+
+    return comparison
+
+
+def get_branch_version(octue_sdk_repo_path, branch):
+    """Get the version of the Octue SDK on a branch from its `pyproject.toml` file without checking the branch out.
+
+    :param str octue_sdk_repo_path:
+    :param str branch:
+    :raise ValueError: if the version can't be read
+    :return str:
+    """
+    show_process = subprocess.run(
+        ["git", "-C", octue_sdk_repo_path, "show", f"{branch}:pyproject.toml"],
+        capture_output=True,
+    )
+
+    match = PYPROJECT_VERSION_PATTERN.search(show_process.stdout.decode())
+
+    if show_process.returncode != 0 or not match:
+        raise ValueError(
+            f"The version on the {branch!r} branch couldn't be read from its `pyproject.toml` file. Pass the "
+            f"candidate's version explicitly.\n\n{show_process.stderr.decode()}"
+        )
+
+    return match.group(1)
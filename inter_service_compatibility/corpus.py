@@ -0,0 +1,94 @@
+"""Size classes for the generated question corpus. Each size class scales one dimension of a question - the number of
+datafiles in the input manifest, the depth of each datafile's tags and labels, or the size of the input values - so the
+effect of message size on each version's compatibility, latency, and memory use can be isolated.
+
+This module only uses the standard library so it can be imported by both the orchestration code and the worker scripts.
+"""
+
+DEFAULT_SIZE_CLASS = "default"
+
+SIZE_CLASSES = {
+    "datafiles-1": {"number_of_datafiles": 1},
+    "datafiles-100": {"number_of_datafiles": 100},
+    "datafiles-10k": {"number_of_datafiles": 10_000},
+    "metadata-deep": {"number_of_datafiles": 100, "number_of_tags": 50, "tag_depth": 5, "number_of_labels": 50},
+    "values-1kb": {"input_values_size": 1_000},
+    "values-100kb": {"input_values_size": 100_000},
+    "values-1mb": {"input_values_size": 1_000_000},
+    "values-10mb": {"input_values_size": 10_000_000},
+}
+
+DEFAULT_QUESTION_PARAMETERS = {
+    "number_of_datafiles": 2,
+    "number_of_tags": 0,
+    "tag_depth": 0,
+    "number_of_labels": 0,
+    "input_values_size": 0,
+}
+
+
+def get_question_parameters(size_class=None):
+    """Get the parameters for generating a question in the given size class.
+
+    :param str|None size_class: the name of a size class in `SIZE_CLASSES`; if `None`, the default question's parameters are returned
+    :raise ValueError: if the size class doesn't exist
+    :return dict:
+    """
+    if size_class in {None, DEFAULT_SIZE_CLASS}:
+        return dict(DEFAULT_QUESTION_PARAMETERS)
+
+    if size_class not in SIZE_CLASSES:
+        raise ValueError(f"{size_class!r} is not a size class. Choose from {list(SIZE_CLASSES)!r}.")
+
+    return {**DEFAULT_QUESTION_PARAMETERS, **SIZE_CLASSES[size_class]}
+
+
+def parse_size_classes(size_classes):
+    """Parse a comma-separated string of size classes to a list. "all" selects every size class.
+
+    :param str|None size_classes:
+    :raise ValueError: if any of the size classes don't exist
+    :return list(str):
+    """
+    if not size_classes:
+        return []
+
+    if size_classes == "all":
+        return list(SIZE_CLASSES)
+
+    parsed_size_classes = size_classes.split(",")
+
+    for size_class in parsed_size_classes:
+        get_question_parameters(size_class)
+
+    return parsed_size_classes
+
+
+def create_nested_tag_value(depth):
+    """Create a tag value nested to the given depth e.g. `{"level_1": {"level_0": [0, 1.5, "a"]}}` for a depth of 2.
+
+    :param int depth:
+    :return dict|list:
+    """
+    value = [0, 1.5, "a"]
+
+    for level in range(depth):
+        value = {f"level_{level}": value}
+
+    return value
+
+
+def create_input_values(input_values_size):
+    """Create input values whose JSON serialisation is roughly the given size in bytes. The default input values are
+    always included.
+
+    :param int input_values_size: the approximate size in bytes; if `0`, only the default input values are returned
+    :return dict:
+    """
+    input_values = {"height": 4, "width": 72}
+
+    if input_values_size:
+        # Each value serialises to around 8 bytes on average (e.g. "0.1234, ").
+        input_values["samples"] = [round((index % 1000) / 1000 + 0.0001, 6) for index in range(input_values_size // 8)]
+
+    return input_values
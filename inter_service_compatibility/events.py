@@ -0,0 +1,281 @@
+"""A structured stream of events describing the progress of a run, emitted by both the orchestrator and the worker
+processes. Each event is a dictionary with an "event" key giving its type, a "time" key (seconds since the epoch), and
+the fields listed for its type in `EVENT_TYPES`. Events are sent to any number of sinks:
+- A console sink that renders them as human-readable lines (always used)
+- A JSONL (JSON lines) file sink that appends each event as a line (e.g. the results log read by the `report` command)
+- A socket sink that sends each event as a datagram to a local UDP or Unix socket (e.g. for a dashboard)
+
+The file and socket sinks are configured with environment variables so worker processes started by the orchestrator
+emit their events to the same sinks. Emitting an event is a single write or send per sink, so it's cheap enough for the
+hot path.
+
+This module only uses the standard library so it can be imported by both the orchestration code and the worker scripts.
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+
+
+EVENTS_FILE_ENVIRONMENT_VARIABLE = "OCTUE_COMPATIBILITY_EVENTS_FILE"
+EVENTS_SOCKET_ENVIRONMENT_VARIABLE = "OCTUE_COMPATIBILITY_EVENTS_SOCKET"
+
+OUTCOMES = ("compatible", "incompatible", "timeout", "skipped")
+
+EVENT_TYPES = {
+    "run_started": ("total_cells",),
+    "version_started": ("version", "perspective"),
+    "version_checkout_started": ("version",),
+    "version_checkout_finished": ("version", "succeeded", "duration"),
+    "version_install_started": ("version",),
+    "version_install_finished": ("version", "succeeded", "duration", "from_snapshot"),
+    "cell_started": ("parent", "child", "size_class"),
+    "cell_finished": ("parent", "child", "size_class", "outcome", "duration"),
+    "question_processing_started": ("parent", "child", "size_class"),
+    "question_processing_finished": ("parent", "child", "size_class", "outcome"),
+    "answer_processing_started": ("parent", "child"),
+    "answer_processing_finished": ("parent", "child", "outcome"),
+    "run_finished": (),
+}
+
+
+class EventStream:
+    """A stream of events sent to the given sinks.
+
+    :param list sinks: objects with a `write(event)` method taking an event dictionary
+    :return None:
+    """
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def emit(self, event_type, **fields):
+        """Emit an event of the given type to every sink.
+
+        :param str event_type: one of the event types in `EVENT_TYPES`
+        :param fields: the event's fields
+        :raise ValueError: if the event type is unknown, any of its fields are missing, or its outcome is unknown
+        :return dict: the event
+        """
+        try:
+            missing_fields = set(EVENT_TYPES[event_type]) - set(fields)
+        except KeyError:
+            raise ValueError(f"{event_type!r} is not an event type. Choose from {list(EVENT_TYPES)!r}.")
+
+        if missing_fields:
+            raise ValueError(f"The {event_type!r} event is missing the fields {sorted(missing_fields)!r}.")
+
+        if "outcome" in fields and fields["outcome"] not in OUTCOMES:
+            raise ValueError(f"{fields['outcome']!r} is not an outcome. Choose from {list(OUTCOMES)!r}.")
+
+        event = {"event": event_type, "time": time.time(), **fields}
+
+        for sink in self.sinks:
+            sink.write(event)
+
+        return event
+
+
+class ConsoleSink:
+    """Render events as human-readable lines. Each event is rendered as whole lines so output from concurrent emitters
+    doesn't interleave mid-line. Events that aren't useful to a person watching (e.g. cells starting) aren't rendered.
+
+    :param io.TextIOBase|None stream: the stream to write to; defaults to the current standard output
+    :return None:
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, event):
+        """Render the event to the stream if it has a rendering.
+
+        :param dict event:
+        :return None:
+        """
+        renderer = getattr(self, f"_render_{event['event']}", None)
+
+        if not renderer:
+            return
+
+        stream = self.stream or sys.stdout
+        stream.write(renderer(event) + "\n")
+        stream.flush()
+
+    def _render_version_started(self, event):
+        version_string = f"\n{event['perspective'].upper()} VERSION {event['version']}"
+        return version_string + "\n" + "=" * (len(version_string) - 1)
+
+    def _render_version_checkout_finished(self, event):
+        if not event["succeeded"]:
+            return "Checking out version... failed."
+
+        return f"Checking out version... done ({event['duration']:.1f}s)."
+
+    def _render_version_install_finished(self, event):
+        if event["from_snapshot"]:
+            return "Using snapshot of version."
+
+        if not event["succeeded"]:
+            return "Installing version... failed."
+
+        return f"Installing version... done ({event['duration']:.1f}s)."
+
+    def _render_question_processing_finished(self, event):
+        if event["size_class"]:
+            description = f"Processing {event['size_class']!r} question from version {event['parent']}..."
+        else:
+            description = f"Processing question from version {event['parent']}..."
+
+        if event["outcome"] == "compatible":
+            return f"{description} succeeded."
+
+        if event.get("error"):
+            return f"{description} {'timed out' if event['outcome'] == 'timeout' else 'failed'}: {event['error']}"
+
+        return f"{description} {'timed out' if event['outcome'] == 'timeout' else 'failed'}."
+
+    def _render_answer_processing_finished(self, event):
+        return f"Processing answer from version {event['child']}... {'succeeded' if event['outcome'] == 'compatible' else 'failed'}."
+
+
+class JSONLinesSink:
+    """Append events to a JSONL (JSON lines) file. Each event is written with a single `write` call to a file opened in
+    append mode so events from concurrent processes don't interleave.
+
+    :param str path:
+    :return None:
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, event):
+        """Append the event to the file.
+
+        :param dict event:
+        :return None:
+        """
+        with open(self.path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+class SocketSink:
+    """Send events as JSON datagrams to a local socket. Events are dropped rather than blocking or raising an error if
+    nothing is listening.
+
+    :param str address: a "host:port" UDP address or the path to a Unix datagram socket
+    :return None:
+    """
+
+    def __init__(self, address):
+        if ":" in address and not address.startswith("/"):
+            host, port = address.rsplit(":", 1)
+            self.address = (host, int(port))
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.address = address
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+        self.socket.setblocking(False)
+
+    def write(self, event):
+        """Send the event to the socket.
+
+        :param dict event:
+        :return None:
+        """
+        try:
+            self.socket.sendto(json.dumps(event).encode(), self.address)
+        except OSError:
+            pass
+
+
+class JSONLinesTailer:
+    """Read new events from a JSONL (JSON lines) file as they're appended, remembering the position reached so each
+    event is only read once. Incomplete final lines (i.e. events still being written) are left until they're complete.
+
+    :param str path:
+    :return None:
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._position = 0
+
+    def read_new_events(self):
+        """Read any events appended since the last read.
+
+        :return list(dict):
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._position)
+            data = f.read()
+
+        complete_data, _, _ = data.rpartition(b"\n")
+
+        if not complete_data:
+            return []
+
+        self._position += len(complete_data) + 1
+        return [json.loads(line) for line in complete_data.split(b"\n") if line.strip()]
+
+
+_event_stream = None
+
+
+def configure_event_stream(events_file_path=None, events_socket_address=None):
+    """Configure the sinks events are emitted to by this process and any worker processes it starts.
+
+    :param str|None events_file_path: if given, append events to this JSONL (JSON lines) file
+    :param str|None events_socket_address: if given, send events to this "host:port" UDP address or Unix datagram socket path
+    :return None:
+    """
+    global _event_stream
+
+    for variable, value in (
+        (EVENTS_FILE_ENVIRONMENT_VARIABLE, events_file_path),
+        (EVENTS_SOCKET_ENVIRONMENT_VARIABLE, events_socket_address),
+    ):
+        if value:
+            os.environ[variable] = value
+        else:
+            os.environ.pop(variable, None)
+
+    _event_stream = None
+
+
+def get_event_stream():
+    """Get the event stream for this process, creating it from the environment variables if needed.
+
+    :return EventStream:
+    """
+    global _event_stream
+
+    if _event_stream is None:
+        sinks = [ConsoleSink()]
+
+        if os.environ.get(EVENTS_FILE_ENVIRONMENT_VARIABLE):
+            sinks.append(JSONLinesSink(os.environ[EVENTS_FILE_ENVIRONMENT_VARIABLE]))
+
+        if os.environ.get(EVENTS_SOCKET_ENVIRONMENT_VARIABLE):
+            sinks.append(SocketSink(os.environ[EVENTS_SOCKET_ENVIRONMENT_VARIABLE]))
+
+        _event_stream = EventStream(sinks)
+
+    return _event_stream
+
+
+def emit(event_type, **fields):
+    """Emit an event to this process's event stream.
+
+    :param str event_type: one of the event types in `EVENT_TYPES`
+    :param fields: the event's fields
+    :return dict: the event
+    """
+    return get_event_stream().emit(event_type, **fields)
@@ -0,0 +1,59 @@
+import json
+import os
+
+from .utils import (
+    checkout_version,
+    install_version,
+    precompile_bytecode,
+    print_version_string,
+    run_command_in_poetry_environment,
+    summarise_import_times,
+)
+
+
+WORKER_MODULES = ("mocks", "utils", "process_question", "record_question")
+
+
+def measure_import_times_across_versions(octue_sdk_repo_path, versions, report_file_path, verbose=False):
+    """Checkout and install the given versions of the Octue SDK and measure how long the worker scripts take to import
+    their dependencies in each one using `python -X importtime`. This is the startup cost paid by every worker process.
+    The report is written to a JSON file mapping each version to its total import time and its most expensive top-level
+    packages (in seconds).
+
+    :param str octue_sdk_repo_path:
+    :param list versions:
+    :param str report_file_path:
+    :param bool verbose:
+    :return dict: the report
+    """
+    os.chdir(octue_sdk_repo_path)
+    report = {}
+
+    for version in versions:
+        print_version_string(version, perspective="worker")
+        checkout_version(version, capture_output=not verbose)
+        install_version(version, capture_output=not verbose)
+        precompile_bytecode()
+
+        print("Measuring import times...", end="", flush=False)
+
+        # Import `mocks` as well as the worker scripts as they defer importing it until they run.
+        process = run_command_in_poetry_environment(
+            f"cd {os.path.dirname(os.path.abspath(__file__))} && "
+            f"python -X importtime -c 'import {', '.join(WORKER_MODULES)}'",
+            capture_output=True,
+        )
+
+        if process.returncode != 0:
+            print("failed.")
+            error_lines = process.stderr.decode().strip().splitlines()
+            report[version] = {"error": error_lines[-1] if error_lines else f"Exited with code {process.returncode}."}
+            continue
+
+        report[version] = summarise_import_times(process.stderr.decode())
+        print(f"done ({report[version]['total']:.2f}s).")
+
+    with open(report_file_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    return report
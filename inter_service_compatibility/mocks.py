@@ -3,20 +3,38 @@ checked out and installed as part of compatibility checking. They're only for te
 communication.
 """
 
-import importlib.metadata
 import json
 import logging
-
-import google.api_core
+import os
 
 from octue.cloud.pub_sub import Subscription, Topic
 from octue.cloud.pub_sub.service import Service
-from octue.resources import Manifest
 
 
 logger = logging.getLogger(__name__)
 
-MESSAGES = {}
+
+def _get_messages_register():
+    """Get the register messages are published to and pulled from. If the `OCTUE_MOCK_BROKER_ADDRESS` environment
+    variable is set, a broker at that address is used so services in different processes can communicate. Otherwise, an
+    in-memory dictionary local to this process is used.
+
+    :return dict|broker.BrokerMessages:
+    """
+    # This is `broker.BROKER_ADDRESS_ENVIRONMENT_VARIABLE`. The broker is only imported if it's needed so the mocks
+    # don't depend on it otherwise.
+    broker_address = os.environ.get("OCTUE_MOCK_BROKER_ADDRESS")
+
+    if not broker_address:
+        return {}
+
+    from broker import BrokerMessages
+
+    # `MockMessage` is looked up when messages are pulled as it's defined below.
+    return BrokerMessages(broker_address, message_class=lambda data, **attributes: MockMessage(data, **attributes))
+
+
+MESSAGES = _get_messages_register()
 
 
 class MockTopic(Topic):
@@ -31,6 +49,8 @@ class MockTopic(Topic):
         """
         if not allow_existing:
             if self.exists():
+                import google.api_core.exceptions
+
                 raise google.api_core.exceptions.AlreadyExists(f"Topic {self.name!r} already exists.")
 
         if not self.exists():
@@ -150,19 +170,27 @@ class MockSubscriber:
             raise ValueError("ValueError: Cannot invoke RPC: Channel closed!")
 
         try:
-            return MockPullResponse(
-                received_messages=[MockMessageWrapper(message=MESSAGES[get_service_id(request["subscription"])].pop(0))]
-            )
+            message = MESSAGES[get_service_id(request["subscription"])].pop(0)
         except IndexError:
             return MockPullResponse(received_messages=[])
 
+        message_wrapper = MockMessageWrapper(message=message)
+        message_wrapper.ack_id = getattr(message, "ack_id", None)
+        return MockPullResponse(received_messages=[message_wrapper])
+
     def acknowledge(self, request):
-        """Do nothing.
+        """Acknowledge the messages if a broker is being used so they aren't redelivered. Otherwise, do nothing.
 
-        :param google.pubsub_v1.types.pubsub.Subscription request:
+        :param dict|google.pubsub_v1.types.pubsub.AcknowledgeRequest request:
         :return None:
         """
-        pass
+        if not hasattr(MESSAGES, "acknowledge"):
+            return
+
+        if isinstance(request, dict):
+            MESSAGES.acknowledge(request.get("ack_ids", []))
+        else:
+            MESSAGES.acknowledge(request.ack_ids)
 
     def create_subscription(self, request):
         """Do nothing.
@@ -252,7 +280,7 @@ class MockService(Service):
         allow_local_files=False,
         question_uuid=None,
         timeout=86400,
-        parent_sdk_version=importlib.metadata.version("octue"),
+        parent_sdk_version=None,
         **kwargs,
     ):
         """Put the question into the messages register, register the existence of the corresponding response topic, add
@@ -265,6 +293,7 @@ class MockService(Service):
         :param bool allow_local_files:
         :param str|None question_uuid:
         :param float|None timeout:
+        :param str|None parent_sdk_version: the version of `octue` the parent is running; defaults to the installed version
         :return MockFuture, str:
         """
         response_subscription, question_uuid = super().ask(
@@ -284,6 +313,16 @@ class MockService(Service):
         if input_manifest is not None:
             input_manifest = input_manifest.serialise()
 
+        # If the child isn't local (e.g. it's running in another process and receiving questions through a broker),
+        # it'll receive the question published by `super().ask` instead.
+        if service_id not in self.children:
+            return response_subscription, question_uuid
+
+        if parent_sdk_version is None:
+            import importlib.metadata
+
+            parent_sdk_version = importlib.metadata.version("octue")
+
         try:
             self.children[service_id].answer(
                 MockMessage(
@@ -341,7 +380,12 @@ class DifferentMockAnalysis:
 
 class MockAnalysisWithOutputManifest:
     output_values = "This is an analysis with an empty output manifest."
-    output_manifest = Manifest()
+
+    @property
+    def output_manifest(self):
+        from octue.resources import Manifest
+
+        return Manifest()
 
 
 class MockSubscriptionCreationResponse:
@@ -355,6 +399,21 @@ class MockSubscriptionCreationResponse:
         self.__dict__ = vars(request)
 
 
+def get_service_topic_name(service_id):
+    """Get the name of the topic a service receives questions on from its ID (e.g. octue.services.<uuid>). This is the
+    key the service's messages are stored under in the global messages dictionary.
+
+    :param str service_id:
+    :return str:
+    """
+    topic_name = service_id.replace("/", ".").replace(":", ".")
+
+    if not topic_name.startswith("octue.services"):
+        topic_name = "octue.services." + topic_name
+
+    return topic_name
+
+
 def get_service_id(path):
     """Get the service ID (e.g. octue.services.<uuid>) from a topic or subscription path (e.g.
     projects/<project-name>/topics/octue.services.<uuid>)
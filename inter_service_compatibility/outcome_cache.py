@@ -0,0 +1,181 @@
+"""A persistent cache of the outcomes of processing questions in children. Processing the same question payload in the
+same child environment with the same worker scripts always has the same outcome, so each outcome is cached under a hash
+of:
+- The question payload
+- The child's source tree (from git, so it's the same whichever tag or branch it was checked out from)
+- The child's lockfile
+- The worker scripts in this repository
+- The answering mode (a worker process per question or concurrent questions in one worker), as the performance
+  measurements taken differ between modes
+
+Only "compatible" and "incompatible" outcomes are cached as timeouts may be transient.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".octue_compatibility_cache")
+DEFAULT_MAX_CACHE_SIZE = 500 * 1024**2
+
+CACHEABLE_OUTCOMES = {"compatible", "incompatible"}
+DEFAULT_ANSWERING_MODE = "process-per-question"
+WORKER_SCRIPT_NAMES = ("process_question.py", "mocks.py", "utils.py", "corpus.py", "broker.py", "events.py")
+
+
+class OutcomeCache:
+    """A directory of cached outcomes with size-bounded eviction. Each entry is stored in its own JSON file. When the
+    total size of the entries exceeds the maximum size, the least recently used entries are deleted.
+
+    :param str directory: the directory to store the cache in
+    :param int max_size: the maximum total size of the cache entries in bytes
+    :return None:
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_size=DEFAULT_MAX_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def get(self, key):
+        """Get the cache entry for the given key, marking it as recently used.
+
+        :param str key:
+        :return dict|None: the cache entry, or `None` if there isn't one
+        """
+        path = self._get_entry_path(key)
+
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        os.utime(path)
+        return entry
+
+    def set(self, key, entry):
+        """Store a cache entry for the given key and evict the least recently used entries if the cache is now too big.
+
+        :param str key:
+        :param dict entry:
+        :return None:
+        """
+        path = self._get_entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, "w") as f:
+            json.dump(entry, f)
+
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the total size of the cache is within its maximum size.
+
+        :return int: the number of entries deleted
+        """
+        entries = []
+
+        for directory_path, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+
+                path = os.path.join(directory_path, filename)
+
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        number_of_deleted_entries = 0
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            total_size -= size
+            number_of_deleted_entries += 1
+
+        return number_of_deleted_entries
+
+    def _get_entry_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+
+def get_environment_hash(octue_sdk_repo_path="."):
+    """Get a hash of the environment a question is processed in: the source tree and lockfile of the checked-out child
+    version and the worker scripts in this repository.
+
+    :param str octue_sdk_repo_path: the path to the local clone of the `octue-sdk-python` repository
+    :raise ChildProcessError: if the source tree can't be read from git
+    :return str:
+    """
+    tree_process = subprocess.run(
+        ["git", "-C", octue_sdk_repo_path, "rev-parse", "HEAD^{tree}"],
+        capture_output=True,
+    )
+
+    if tree_process.returncode != 0:
+        raise ChildProcessError(f"Getting the source tree hash failed.\n\n{tree_process.stderr.decode()}")
+
+    environment_hash = hashlib.sha256(tree_process.stdout.strip())
+
+    try:
+        with open(os.path.join(octue_sdk_repo_path, "poetry.lock"), "rb") as f:
+            environment_hash.update(hashlib.sha256(f.read()).digest())
+    except FileNotFoundError:
+        pass
+
+    environment_hash.update(_get_worker_scripts_hash().encode())
+    return environment_hash.hexdigest()
+
+
+def get_cell_key(question, environment_hash, answering_mode=DEFAULT_ANSWERING_MODE):
+    """Get the cache key for processing a question in an environment in the given answering mode.
+
+    :param dict question: a deserialised recorded question
+    :param str environment_hash: the hash from `get_environment_hash`
+    :param str answering_mode: how the question is answered (see `get_answering_mode`)
+    :return str:
+    """
+    question_hash = hashlib.sha256(json.dumps(question, sort_keys=True).encode()).hexdigest()
+    return hashlib.sha256(f"{question_hash}:{environment_hash}:{answering_mode}".encode()).hexdigest()
+
+
+def get_answering_mode(concurrent_questions=None):
+    """Get the name of the mode questions are answered in.
+
+    :param int|None concurrent_questions: the maximum number of questions answered at once in one worker process, if any
+    :return str:
+    """
+    if concurrent_questions:
+        return f"concurrent-{concurrent_questions}"
+
+    return DEFAULT_ANSWERING_MODE
+
+
+def _get_worker_scripts_hash():
+    """Get a hash of the worker scripts run in the child's environment so changing them invalidates the cache.
+
+    :return str:
+    """
+    worker_scripts_hash = hashlib.sha256()
+
+    for name in WORKER_SCRIPT_NAMES:
+        with open(os.path.join(os.path.dirname(__file__), name), "rb") as f:
+            worker_scripts_hash.update(f.read())
+
+    return worker_scripts_hash.hexdigest()
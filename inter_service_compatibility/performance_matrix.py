@@ -0,0 +1,68 @@
+import json
+
+from .corpus import DEFAULT_SIZE_CLASS
+from .versions import parse_version
+
+
+METRICS = ("wall_time", "cpu_time", "max_rss", "parse_time", "answer_time", "peak_memory")
+
+
+def create_performance_matrix(performance_file_path, size_class=DEFAULT_SIZE_CLASS):
+    """Create heat-map-ready matrices of the performance measurements for a question size class from a performance file.
+    The rows are the parent versions and the columns are the child versions, both newest first, matching the layout of
+    the compatibility matrix. As well as the raw measurements, each metric is given relative to the best (lowest)
+    measurement in its row, so a child version taking e.g. five times longer than others to handle a parent's question
+    stands out. Missing measurements are `None`.
+
+    :param str performance_file_path: the path to a performance file produced by the `process-questions` command
+    :param str size_class: the question size class to create the matrix for
+    :return dict: the parent and child versions, the compatibility matrix, and the absolute and relative matrices of each metric
+    """
+    with open(performance_file_path) as f:
+        performance = json.load(f)
+
+    parents = sorted(
+        (parent for parent, row in performance.items() if any(size_class in cell for cell in row.values())),
+        key=parse_version,
+        reverse=True,
+    )
+
+    children = sorted(
+        {child for parent in parents for child, cell in performance[parent].items() if size_class in cell},
+        key=parse_version,
+        reverse=True,
+    )
+
+    def get_cell(parent, child):
+        return performance[parent].get(child, {}).get(size_class, {})
+
+    matrix = {
+        "size_class": size_class,
+        "parents": parents,
+        "children": children,
+        "compatibility": [[get_cell(parent, child).get("compatible") for child in children] for parent in parents],
+        "metrics": {},
+        "relative_metrics": {},
+    }
+
+    for metric in METRICS:
+        rows = [[get_cell(parent, child).get(metric) for child in children] for parent in parents]
+        matrix["metrics"][metric] = rows
+        matrix["relative_metrics"][metric] = [_make_relative_to_best(row) for row in rows]
+
+    return matrix
+
+
+def _make_relative_to_best(row):
+    """Divide each value in the row by the lowest positive value in the row.
+
+    :param list(float|None) row:
+    :return list(float|None):
+    """
+    values = [value for value in row if value]
+
+    if not values:
+        return [None] * len(row)
+
+    best = min(values)
+    return [value / best if value is not None else None for value in row]
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from schemas import create_child_profile, get_probe_variants
+
+from utils import ServicePatcher
+
+
+DEFAULT_VARIANT_TIMEOUT = 60
+
+
+def probe_child(question_file_path, profile_file_path, variant_timeout=DEFAULT_VARIANT_TIMEOUT):
+    """Probe which keys a child running the current version of `octue` requires in questions and whether it tolerates
+    unknown keys. A single child is served and answers each variant of the reference question in turn (see
+    `schemas.get_probe_variants`). The child's profile (see `schemas.create_child_profile`) is written to the profile
+    file so the outcomes of other questions can be predicted from their shapes.
+
+    :param str question_file_path: the path to a JSON file containing the reference question (usually the question recorded from the same version)
+    :param str profile_file_path: the path to a JSON file to write the child's profile to
+    :param float variant_timeout: the maximum number of seconds to let each variant take before marking it as timed out
+    :return dict: the child's profile
+    """
+    from process_question import create_output_manifest, create_run_function, get_answer_topic_name, test_compatibility
+
+    from mocks import MESSAGES, MockService
+    from octue.resources.service_backends import GCPPubSubBackend
+
+    with open(question_file_path) as f:
+        question = json.load(f)
+
+    probe_outcomes = []
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        child = MockService(
+            backend=GCPPubSubBackend(project_name="octue-amy"),
+            run_function=create_run_function(create_output_manifest(temporary_directory)),
+        )
+
+        answer_topic_name = get_answer_topic_name(child, question)
+
+        # Variants are answered one at a time in a thread so a hanging variant can be abandoned.
+        executor = ThreadPoolExecutor(max_workers=1)
+
+        with ServicePatcher():
+            child.serve()
+
+            for kind, target, variant in get_probe_variants(question):
+                MESSAGES[answer_topic_name] = []
+                future = executor.submit(test_compatibility, variant, child, serve=False)
+
+                try:
+                    future.result(timeout=variant_timeout)
+                    outcome = "compatible"
+                except TimeoutError:
+                    outcome = "timeout"
+                    executor = ThreadPoolExecutor(max_workers=1)
+                except Exception:
+                    outcome = "incompatible"
+
+                probe_outcomes.append({"kind": kind, "target": target, "outcome": outcome})
+
+        executor.shutdown(wait=False)
+
+    profile = create_child_profile(question, probe_outcomes)
+
+    with open(profile_file_path, "w") as f:
+        json.dump(profile, f)
+
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("question_file_path")
+    parser.add_argument("profile_file_path")
+    parser.add_argument("--variant-timeout", dest="variant_timeout", type=float, default=DEFAULT_VARIANT_TIMEOUT)
+    arguments = parser.parse_args()
+
+    probe_child(arguments.question_file_path, arguments.profile_file_path, variant_timeout=arguments.variant_timeout)
+
+    # Exit without waiting for the threads of any timed-out variants, which can't be stopped.
+    sys.stdout.flush()
+    os._exit(0)
@@ -0,0 +1,69 @@
+import json
+import sys
+
+from events import emit
+
+from utils import ServicePatcher, save_result
+
+
+def process_answer(answer_file_path, results_file_path, parent_sdk_version):
+    """Using a parent of the given SDK version, process the given answer messages recorded from a child of a certain
+    version to check the compatibility of the two versions. The messages are fed through the parent's message handler
+    as if the child had just published them. The result of this is added to the results file at the given path.
+
+    :param str answer_file_path:
+    :param str results_file_path:
+    :param str parent_sdk_version:
+    :return None:
+    """
+    from mocks import MockService
+    from octue.resources.service_backends import GCPPubSubBackend
+
+    with open(answer_file_path) as f:
+        answer = json.load(f)
+
+    child_sdk_version = answer["child_sdk_version"]
+    emit("answer_processing_started", parent=parent_sdk_version, child=child_sdk_version)
+
+    backend = GCPPubSubBackend(project_name="my-project")
+    child = MockService(backend=backend)
+
+    # Avoid the mock child answering the question - the recorded answer is replayed instead.
+    child.answer = lambda *args, **kwargs: None
+
+    parent = MockService(backend=backend, children={child.id: child})
+
+    try:
+        test_compatibility(answer, parent, child)
+    except Exception as error:
+        save_result(results_file_path, parent_sdk_version, child_sdk_version, compatible=False)
+        emit("answer_processing_finished", parent=parent_sdk_version, child=child_sdk_version, outcome="incompatible")
+        raise error
+
+    save_result(results_file_path, parent_sdk_version, child_sdk_version, compatible=True)
+    emit("answer_processing_finished", parent=parent_sdk_version, child=child_sdk_version, outcome="compatible")
+
+
+def test_compatibility(answer, parent, child):
+    from mocks import MESSAGES, MockMessage, get_service_id
+
+    with ServicePatcher():
+        child.serve()
+
+        subscription, _ = parent.ask(
+            child.id,
+            input_values={"height": 4, "width": 72},
+            question_uuid=answer["question_uuid"],
+        )
+
+        # Put the recorded messages on the answer topic as if the child had just published them.
+        MESSAGES[get_service_id(subscription.path)] = [
+            MockMessage(data=message["data"].encode(), **message["attributes"]) for message in answer["messages"]
+        ]
+
+        parent.wait_for_answer(subscription, timeout=60)
+
+
+if __name__ == "__main__":
+    answer_file_path, results_file_path, parent_sdk_version = sys.argv[1:4]
+    process_answer(answer_file_path, results_file_path, parent_sdk_version)
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+
+from .utils import (
+    checkout_version,
+    install_version,
+    precompile_bytecode,
+    print_version_string,
+    run_command_in_poetry_environment,
+)
+
+
+ANSWER_PROCESSING_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "process_answer.py")
+
+
+def process_answers_across_versions(
+    octue_sdk_repo_path,
+    parent_versions,
+    child_versions,
+    answers_file_path,
+    results_file_path,
+    verbose=False,
+):
+    """Checkout and install the given parent versions of the Octue SDK and process answers recorded from the given child
+    versions to check if the parent-child combination is compatible in the answer direction. Each parent version is
+    installed once and the latest recorded answer from each child version is replayed into it. The results are recorded
+    in a file.
+
+    :param str octue_sdk_repo_path:
+    :param list parent_versions:
+    :param list child_versions:
+    :param str answers_file_path:
+    :param str results_file_path:
+    :param bool verbose:
+    :return None:
+    """
+    os.chdir(octue_sdk_repo_path)
+
+    answers = {}
+
+    with open(answers_file_path) as f:
+        for answer in f:
+            if answer.strip():
+                answers[json.loads(answer)["child_sdk_version"]] = answer
+
+    if not answers:
+        raise ValueError(f"No answers have been found in the answers file at {answers_file_path!r}.")
+
+    for parent_version in parent_versions:
+        print_version_string(parent_version, perspective="parent")
+        checkout_version(parent_version, capture_output=not verbose)
+        install_version(parent_version, capture_output=not verbose)
+        precompile_bytecode()
+
+        for child_sdk_version, answer in answers.items():
+            if child_sdk_version not in child_versions:
+                if verbose:
+                    print(f"Version {child_sdk_version!r} not included in {child_versions!r}.")
+                continue
+
+            with tempfile.NamedTemporaryFile() as temporary_file:
+                with open(temporary_file.name, "w") as f:
+                    f.write(answer)
+
+                process = run_command_in_poetry_environment(
+                    f"python {ANSWER_PROCESSING_SCRIPT_PATH} {temporary_file.name} {results_file_path} {parent_version}",
+                )
+
+                if process.returncode != 0:
+                    print(
+                        f"Answers from child SDK version {child_sdk_version} maybe be incompatible with parent SDK "
+                        f"version {parent_version}.\n{process.stdout or ''}\n{process.stderr or ''}"
+                    )
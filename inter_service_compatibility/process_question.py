@@ -1,47 +1,63 @@
+import argparse
 import base64
+import collections
 import json
 import logging
 import os
+import queue
 import sys
 import tempfile
+import threading
+import time
 
-from utils import ServicePatcher
+from events import emit
+
+from utils import ServicePatcher, get_peak_memory, save_performance, save_result
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 8
+TIMEOUT_POLL_INTERVAL = 0.5
+
 
-def process_question(question_file_path, results_file_path, child_sdk_version):
+def process_question(
+    question_file_path,
+    results_file_path,
+    child_sdk_version,
+    answers_file_path=None,
+    performance_file_path=None,
+):
     """Using a child of the given SDK version, process the given question from a parent of a certain version to check
-    the compatibility of the two versions. The result of this is added to the results file at the given path.
+    the compatibility of the two versions. The result of this is added to the results file at the given path. If an
+    answers file path is given and the question is processed successfully, the messages the child published to the
+    answer topic (e.g. log, monitor, and answer messages) are recorded to it so they can be replayed into parents.
+
+    If a performance file path is given, the time taken to parse and answer the question and the peak memory used are
+    added to it under the question's size class. Questions generated for a size class (see `corpus.SIZE_CLASSES`) only
+    have their results recorded in the performance file so they don't affect the compatibility matrix.
 
     :param str question_file_path:
     :param str results_file_path:
     :param str child_sdk_version:
+    :param str|None answers_file_path: the path to a JSONL (JSON lines) file to record the child's answer messages to
+    :param str|None performance_file_path: the path to a JSON file to record the performance measurements in
     :return None:
     """
     from mocks import MESSAGES, MockService
-    from octue.resources import Manifest
     from octue.resources.service_backends import GCPPubSubBackend
 
     with tempfile.TemporaryDirectory() as temporary_directory:
-        os.mkdir(os.path.join(temporary_directory, "path-within-dataset"))
-
-        datafile_0_path = os.path.join(temporary_directory, "path-within-dataset", "a_test_file.csv")
-        with open(datafile_0_path, "w") as f:
-            f.write("blah")
-
-        datafile_1_path = os.path.join(temporary_directory, "path-within-dataset", "another_test_file.csv")
-        with open(datafile_1_path, "w") as f:
-            f.write("blah")
-
-        output_manifest = Manifest(datasets={"output_dataset": temporary_directory})
+        output_manifest = create_output_manifest(temporary_directory)
 
         with open(question_file_path) as f:
             question = json.load(f)
 
         parent_sdk_version = question["parent_sdk_version"]
-        print(f"Processing question from version {parent_sdk_version}... ", end="", flush=False)
+        size_class = question.get("size_class")
+
+        cell = {"parent": parent_sdk_version, "child": child_sdk_version, "size_class": size_class}
+        emit("question_processing_started", **cell)
 
         child = MockService(
             backend=GCPPubSubBackend(project_name="octue-amy"),
@@ -49,26 +65,245 @@ def process_question(question_file_path, results_file_path, child_sdk_version):
         )
 
         # Create the mock answer topic.
-        answer_topic_name = (
-            child.id.replace("/", ".").replace(":", ".")
-            + ".answers."
-            + question["question"]["attributes"]["question_uuid"]
-        )
-
-        if not answer_topic_name.startswith("octue.services"):
-            answer_topic_name = "octue.services." + answer_topic_name
-
+        answer_topic_name = get_answer_topic_name(child, question)
         MESSAGES[answer_topic_name] = []
 
+        measurements = {}
+        outcome = {
+            "results_file_path": results_file_path,
+            "performance_file_path": performance_file_path,
+            "parent_sdk_version": parent_sdk_version,
+            "child_sdk_version": child_sdk_version,
+            "size_class": size_class,
+            "measurements": measurements,
+        }
+
         try:
-            test_compatibility(question, child)
+            test_compatibility(question, child, measurements)
         except Exception as error:
-            print("failed.")
-            save_result(results_file_path, parent_sdk_version, child_sdk_version, compatible=False)
+            save_outcome(**outcome, compatible=False)
+            emit("question_processing_finished", **cell, outcome="incompatible")
             raise error
 
-        save_result(results_file_path, parent_sdk_version, child_sdk_version, compatible=True)
-        print("succeeded.")
+        save_outcome(**outcome, compatible=True)
+
+        if answers_file_path and not size_class:
+            record_answer(
+                answers_file_path,
+                messages=MESSAGES[answer_topic_name],
+                question_uuid=question["question"]["attributes"]["question_uuid"],
+                parent_sdk_version=parent_sdk_version,
+                child_sdk_version=child_sdk_version,
+            )
+
+        emit("question_processing_finished", **cell, outcome="compatible")
+
+
+def process_questions_concurrently(
+    questions_file_path,
+    results_file_path,
+    child_sdk_version,
+    outcomes_file_path,
+    max_workers=DEFAULT_MAX_WORKERS,
+    timeout=None,
+):
+    """Using a single child of the given SDK version, process a batch of questions concurrently. The child is served
+    once and each question is answered on its own answer topic in its own thread, with at most `max_workers` questions
+    running at once, so time spent idling in the mocked Pub/Sub calls overlaps. A slow or hanging question doesn't block
+    the rest - if it takes longer than the timeout, it's marked as timed out and abandoned, and the next question starts
+    in its place.
+
+    The result of each question is added to the results file as in `process_question`. Each question's outcome
+    ("compatible", "incompatible", or "timeout") and its measurements are appended to the outcomes file as a JSON line
+    as soon as it's known, so only the outcomes of the questions still running are lost if the process is killed. The
+    child's answers aren't recorded because the SDK's log forwarding is process-wide, so the log messages in an answer
+    could include some from other questions.
+
+    :param str questions_file_path: the path to a JSONL (JSON lines) file of recorded questions
+    :param str results_file_path:
+    :param str child_sdk_version:
+    :param str outcomes_file_path: the path to a JSONL (JSON lines) file to append the outcome of each question to
+    :param int max_workers: the maximum number of questions to answer at once
+    :param float|None timeout: if given, the maximum number of seconds to let each question take
+    :return dict: the outcomes keyed by question UUID
+    """
+    from mocks import MESSAGES, MockService
+    from octue.resources.service_backends import GCPPubSubBackend
+
+    with open(questions_file_path) as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    outcomes = {}
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        child = MockService(
+            backend=GCPPubSubBackend(project_name="octue-amy"),
+            run_function=create_run_function(create_output_manifest(temporary_directory)),
+        )
+
+        for question in questions:
+            MESSAGES[get_answer_topic_name(child, question)] = []
+
+        waiting = collections.deque(questions)
+        running = {}
+        finished = queue.Queue()
+
+        with ServicePatcher():
+            child.serve()
+
+            while waiting or running:
+                # Abandoned questions don't count towards the running questions, so they never hold up the others.
+                while waiting and len(running) < max_workers:
+                    question = waiting.popleft()
+
+                    emit(
+                        "question_processing_started",
+                        parent=question["parent_sdk_version"],
+                        child=child_sdk_version,
+                        size_class=question.get("size_class"),
+                    )
+
+                    measurements = {}
+                    running[question["question"]["attributes"]["question_uuid"]] = (
+                        question,
+                        measurements,
+                        time.perf_counter(),
+                    )
+
+                    threading.Thread(
+                        target=_answer_question,
+                        args=(question, child, measurements, finished),
+                        daemon=True,
+                    ).start()
+
+                try:
+                    question_uuid, error = finished.get(timeout=TIMEOUT_POLL_INTERVAL)
+                except queue.Empty:
+                    question_uuid = None
+
+                # Questions that finish after being abandoned keep their timeout outcome.
+                if question_uuid in running:
+                    question, measurements, start_time = running.pop(question_uuid)
+                    compatible = error is None
+                    measurements["wall_time"] = time.perf_counter() - start_time
+
+                    save_outcome(
+                        results_file_path,
+                        performance_file_path=None,
+                        parent_sdk_version=question["parent_sdk_version"],
+                        child_sdk_version=child_sdk_version,
+                        size_class=question.get("size_class"),
+                        measurements=measurements,
+                        compatible=compatible,
+                    )
+
+                    emit(
+                        "question_processing_finished",
+                        parent=question["parent_sdk_version"],
+                        child=child_sdk_version,
+                        size_class=question.get("size_class"),
+                        outcome="compatible" if compatible else "incompatible",
+                        error=None if compatible else repr(error),
+                    )
+
+                    # Answers aren't recorded as log forwarding is process-wide, so they could include other questions' logs.
+                    outcomes[question_uuid] = {
+                        "outcome": "compatible" if compatible else "incompatible",
+                        "measurements": {"compatible": compatible, **measurements, "peak_memory": get_peak_memory()},
+                        "answers": [],
+                    }
+
+                    _append_outcome(outcomes_file_path, question_uuid, outcomes[question_uuid])
+
+                if not timeout:
+                    continue
+
+                for question_uuid, (question, measurements, start_time) in list(running.items()):
+                    if time.perf_counter() - start_time < timeout:
+                        continue
+
+                    # Running threads can't be stopped, so the question is abandoned instead.
+                    del running[question_uuid]
+
+                    emit(
+                        "question_processing_finished",
+                        parent=question["parent_sdk_version"],
+                        child=child_sdk_version,
+                        size_class=question.get("size_class"),
+                        outcome="timeout",
+                    )
+
+                    outcomes[question_uuid] = {
+                        "outcome": "timeout",
+                        "measurements": {**measurements, "wall_time": time.perf_counter() - start_time},
+                        "answers": [],
+                    }
+
+                    _append_outcome(outcomes_file_path, question_uuid, outcomes[question_uuid])
+
+    return outcomes
+
+
+def _answer_question(question, child, measurements, finished):
+    """Check an already-served child can parse and answer the question, reporting when the question is finished.
+
+    :param dict question: a recorded question
+    :param mocks.MockService child:
+    :param dict measurements: the time in seconds taken to parse and answer the question are added to this
+    :param queue.Queue finished: the question's UUID and the error it raised (or `None` if it succeeded) are put on this when it's finished
+    :return None:
+    """
+    try:
+        test_compatibility(question, child, measurements, serve=False)
+    except Exception as error:
+        finished.put((question["question"]["attributes"]["question_uuid"], error))
+    else:
+        finished.put((question["question"]["attributes"]["question_uuid"], None))
+
+
+def _append_outcome(outcomes_file_path, question_uuid, outcome):
+    """Append a question's outcome to the outcomes file as a JSON line.
+
+    :param str outcomes_file_path:
+    :param str question_uuid:
+    :param dict outcome:
+    :return None:
+    """
+    with open(outcomes_file_path, "a") as f:
+        f.write(json.dumps({"question_uuid": question_uuid, **outcome}) + "\n")
+
+
+def create_output_manifest(directory_path):
+    """Create an output manifest containing a dataset of two small files in the given directory.
+
+    :param str directory_path:
+    :return octue.resources.Manifest:
+    """
+    from octue.resources import Manifest
+
+    os.mkdir(os.path.join(directory_path, "path-within-dataset"))
+
+    datafile_0_path = os.path.join(directory_path, "path-within-dataset", "a_test_file.csv")
+    with open(datafile_0_path, "w") as f:
+        f.write("blah")
+
+    datafile_1_path = os.path.join(directory_path, "path-within-dataset", "another_test_file.csv")
+    with open(datafile_1_path, "w") as f:
+        f.write("blah")
+
+    return Manifest(datasets={"output_dataset": directory_path})
+
+
+def get_answer_topic_name(child, question):
+    """Get the name of the mock answer topic the child answers the question on.
+
+    :param mocks.MockService child:
+    :param dict question: a recorded question
+    :return str:
+    """
+    from mocks import get_service_topic_name
+
+    return get_service_topic_name(child.id) + ".answers." + question["question"]["attributes"]["question_uuid"]
 
 
 def create_run_function(output_manifest):
@@ -108,9 +343,22 @@ def create_run_function(output_manifest):
     return Runner(app_src=mock_app, twine=twine).run
 
 
-def test_compatibility(question, child):
+def test_compatibility(question, child, measurements=None, serve=True):
+    """Check the child can parse and answer the question.
+
+    :param dict question: a recorded question
+    :param mocks.MockService child:
+    :param dict|None measurements: if given, the time in seconds taken to parse and answer the question are added to this as "parse_time" and "answer_time"
+    :param bool serve: if `False`, the child must already be served inside a `ServicePatcher` (e.g. when answering questions concurrently)
+    :return None:
+    """
     from octue.resources import Manifest
 
+    if measurements is None:
+        measurements = {}
+
+    start_time = time.perf_counter()
+
     # Check serialised input manifests can be deserialised.
     deserialised_question_data = json.loads(question["question"]["data"])
 
@@ -119,30 +367,137 @@ def test_compatibility(question, child):
     except TypeError:
         Manifest.deserialise(deserialised_question_data["input_manifest"])
 
+    measurements["parse_time"] = time.perf_counter() - start_time
+
     # Encode the question data as it would be when received from Pub/Sub.
     question["question"]["data"] = base64.b64encode(question["question"]["data"].encode())
 
     # Check the rest of the question can be parsed.
-    with ServicePatcher():
-        child.serve()
+    start_time = time.perf_counter()
+
+    if serve:
+        with ServicePatcher():
+            child.serve()
+            child.answer(question["question"])
+    else:
         child.answer(question["question"])
 
+    measurements["answer_time"] = time.perf_counter() - start_time
 
-def save_result(results_file_path, parent_sdk_version, child_sdk_version, compatible):
-    try:
-        with open(results_file_path, "r") as f:
-            results = json.load(f)
-    except FileNotFoundError:
-        results = {}
 
-    parent_row = results.get(parent_sdk_version, {})
-    parent_row[child_sdk_version] = compatible
-    results[parent_sdk_version] = parent_row
+def record_answer(answers_file_path, messages, question_uuid, parent_sdk_version, child_sdk_version):
+    """Record the messages a child published to the answer topic in response to a question so they can be replayed into
+    parents running other versions.
 
-    with open(results_file_path, "w") as f:
-        json.dump(results, f)
+    :param str answers_file_path: the path to a JSONL (JSON lines) file to append the answer to
+    :param list(mocks.MockMessage) messages: the messages the child published, in the order they were published
+    :param str question_uuid: the UUID of the question that was answered
+    :param str parent_sdk_version: the version of the parent that asked the question
+    :param str child_sdk_version: the version of the child that answered the question
+    :return None:
+    """
+    serialised_answer = serialise_answer(messages, question_uuid, parent_sdk_version, child_sdk_version)
+
+    with open(answers_file_path, "a") as f:
+        f.write(serialised_answer + "\n")
+
+
+def serialise_answer(messages, question_uuid, parent_sdk_version, child_sdk_version):
+    """Serialise the messages a child published to the answer topic in response to a question to a line of JSON.
+
+    :param list(mocks.MockMessage) messages: the messages the child published, in the order they were published
+    :param str question_uuid: the UUID of the question that was answered
+    :param str parent_sdk_version: the version of the parent that asked the question
+    :param str child_sdk_version: the version of the child that answered the question
+    :return str:
+    """
+    from octue.utils.encoders import OctueJSONEncoder
+
+    return json.dumps(
+        {
+            "parent_sdk_version": parent_sdk_version,
+            "child_sdk_version": child_sdk_version,
+            "question_uuid": question_uuid,
+            "messages": [
+                {
+                    "data": message.data.decode() if isinstance(message.data, bytes) else message.data,
+                    "attributes": message.attributes,
+                }
+                for message in messages
+            ],
+        },
+        cls=OctueJSONEncoder,
+    )
+
+
+def save_outcome(
+    results_file_path,
+    performance_file_path,
+    parent_sdk_version,
+    child_sdk_version,
+    size_class,
+    measurements,
+    compatible,
+):
+    """Save the outcome of processing a question. The standard question's result is saved to the results file while
+    questions generated for a size class are only saved to the performance file (if one is given) along with the
+    performance measurements.
+
+    :param str results_file_path:
+    :param str|None performance_file_path:
+    :param str parent_sdk_version:
+    :param str child_sdk_version:
+    :param str|None size_class:
+    :param dict measurements:
+    :param bool compatible:
+    :return None:
+    """
+    from corpus import DEFAULT_SIZE_CLASS
+
+    if not size_class:
+        save_result(results_file_path, parent_sdk_version, child_sdk_version, compatible=compatible)
+
+    if performance_file_path:
+        save_performance(
+            performance_file_path,
+            parent_sdk_version,
+            child_sdk_version,
+            size_class=size_class or DEFAULT_SIZE_CLASS,
+            measurements={"compatible": compatible, **measurements, "peak_memory": get_peak_memory()},
+        )
 
 
 if __name__ == "__main__":
-    question_file_path, results_file_path, child_sdk_version = sys.argv[1:4]
-    process_question(question_file_path, results_file_path, child_sdk_version)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("question_file_path")
+    parser.add_argument("results_file_path")
+    parser.add_argument("child_sdk_version")
+    parser.add_argument("--answers-file", dest="answers_file_path", default=None)
+    parser.add_argument("--performance-file", dest="performance_file_path", default=None)
+    parser.add_argument("--concurrent-questions", dest="concurrent_questions", type=int, default=None)
+    parser.add_argument("--outcomes-file", dest="outcomes_file_path", default=None)
+    parser.add_argument("--question-timeout", dest="question_timeout", type=float, default=None)
+    arguments = parser.parse_args()
+
+    if arguments.concurrent_questions:
+        outcomes = process_questions_concurrently(
+            arguments.question_file_path,
+            arguments.results_file_path,
+            arguments.child_sdk_version,
+            outcomes_file_path=arguments.outcomes_file_path,
+            max_workers=arguments.concurrent_questions,
+            timeout=arguments.question_timeout,
+        )
+
+        # Exit without waiting for the threads of any timed-out questions, which can't be stopped. The exit code is only
+        # zero if every question was answered successfully.
+        sys.stdout.flush()
+        os._exit(0 if all(outcome["outcome"] == "compatible" for outcome in outcomes.values()) else 1)
+
+    process_question(
+        arguments.question_file_path,
+        arguments.results_file_path,
+        arguments.child_sdk_version,
+        answers_file_path=arguments.answers_file_path,
+        performance_file_path=arguments.performance_file_path,
+    )
@@ -1,11 +1,28 @@
 import json
 import os
+import shutil
 import tempfile
 
-from .utils import checkout_version, install_version, print_version_string, run_command_in_poetry_environment
+from .corpus import DEFAULT_SIZE_CLASS
+from .events import emit
+from .outcome_cache import CACHEABLE_OUTCOMES, get_answering_mode, get_cell_key, get_environment_hash
+from .schemas import get_probe_variants, get_question_shape, predict_outcome
+from .utils import (
+    checkout_version,
+    get_environment_snapshot_path,
+    install_version,
+    materialise_environment_snapshot,
+    precompile_bytecode,
+    print_version_string,
+    run_measured_command_in_poetry_environment,
+    save_answers,
+    save_performance,
+    save_result,
+)
 
 
 QUESTION_PROCESSING_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "process_question.py")
+CHILD_PROBING_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "probe_child.py")
 
 
 def process_questions_across_versions(
@@ -15,57 +32,595 @@ def process_questions_across_versions(
     recording_file_path,
     results_file_path,
     untagged_child_version_branches=None,
+    answers_file_path=None,
+    performance_file_path=None,
+    question_ids=None,
+    timeout=None,
+    outcome_cache=None,
+    snapshots_directory=None,
+    concurrent_questions=None,
+    predict=False,
+    predictions_file_path=None,
     verbose=False,
 ):
     """Checkout and install the given child versions of the Octue SDK and process questions from the given parent
     versions to check if the parent-child combination is compatible. The results are recorded in a file.
 
+    If a child version can't be checked out or installed, its questions are skipped and the rest of the child versions
+    are processed before an error is raised.
+
+    If an outcome cache is given, questions that have already been processed in an identical child environment (e.g. the
+    same source tree checked out from a different branch) aren't processed again - their cached outcomes, measurements,
+    and answers are used instead. If all of a child version's questions are cached, it isn't installed at all.
+
+    If a snapshots directory is given, each child version's installed environment is stored there as an immutable
+    snapshot the first time it's installed. Later runs (and other workers on the same machine) materialise a working
+    environment from the snapshot by reflinking or hardlinking it instead of installing the version again.
+
+    If a number of concurrent questions is given, each child version's questions are answered by a single child in one
+    worker process with that many questions in flight at once (see `process_question.process_questions_concurrently`)
+    instead of in a worker process per question. The timeout then applies to each question individually. The performance
+    measurements of each question are then only its own wall time, parse and answer times, and the worker's peak memory.
+
+    If predicting is enabled, each child version is first probed with the question recorded from the same version to
+    find which keys it requires and whether it tolerates unknown keys (see `schemas`). Predictions only consider the
+    shapes of questions, so only questions predicted to be incompatible (e.g. because they're missing a key the child
+    requires) are skipped - all other questions are still processed. A skipped question is recorded as incompatible in
+    the results file and in the predictions file (if given, and emptied at the start of the run) so its result can be
+    told apart from the processed ones. As the probe only shows that a child couldn't answer a question without a key,
+    not that no other form of the question would work (e.g. one using an older name for the key), these are predicted
+    incompatibilities rather than proven ones. Predicted outcomes have no performance measurements or answers and aren't
+    cached.
+
     :param str octue_sdk_repo_path:
-    :param list parent_versions:
+    :param list|None parent_versions: if `None`, questions from all parent versions are processed
     :param list child_versions:
     :param str recording_file_path:
     :param str results_file_path:
     :param dict|None untagged_child_version_branches: a mapping of branch names to untagged child versions
+    :param str|None answers_file_path: if given, record the answers to successfully processed questions to this JSONL file
+    :param str|None performance_file_path: if given, record the time and memory taken to process each question to this JSON file. This includes the wall time, CPU time, and peak memory of each question's whole worker process.
+    :param iter(str)|None question_ids: if given, only process the questions with these IDs (see `get_question_id`)
+    :param float|None timeout: if given, the maximum number of seconds to let each question take before stopping it and marking it as timed out
+    :param inter_service_compatibility.outcome_cache.OutcomeCache|None outcome_cache: if given, reuse cached outcomes and cache new ones in this
+    :param str|None snapshots_directory: if given, store and reuse snapshots of the child versions' environments in this directory
+    :param int|None concurrent_questions: if given, answer this many questions at once in a single worker process per child version
+    :param bool predict: if `True`, predict the outcomes of questions from their shapes and skip processing those predicted to be incompatible
+    :param str|None predictions_file_path: if given, record the results of the questions skipped because they're predicted to be incompatible to this JSON file in the same format as the results file
     :param bool verbose:
+    :raise ChildProcessError: if any of the child versions couldn't be checked out or installed
     :return None:
     """
     os.chdir(octue_sdk_repo_path)
 
+    # Only the questions skipped in this run should be listed as unprocessed.
+    if predict and predictions_file_path:
+        with open(predictions_file_path, "w") as f:
+            json.dump({}, f)
+
     with open(recording_file_path) as f:
         questions = f.readlines()
 
     if not questions:
         raise ValueError("No questions have been found in the questions file at %r.", recording_file_path)
 
+    selected_questions = []
+
+    for question in questions:
+        deserialised_question = json.loads(question)
+        parent_sdk_version = deserialised_question["parent_sdk_version"]
+
+        if parent_versions is not None and parent_sdk_version not in parent_versions:
+            if verbose:
+                print(f"Version {parent_sdk_version!r} not included in {parent_versions!r}.")
+            continue
+
+        if question_ids is not None and get_question_id(deserialised_question) not in question_ids:
+            continue
+
+        selected_questions.append((question, deserialised_question))
+
+    emit("run_started", total_cells=len(child_versions) * len(selected_questions))
+
+    failed_child_versions = []
+
     for child_version in child_versions:
         print_version_string(child_version, perspective="child")
 
-        if untagged_child_version_branches and child_version in untagged_child_version_branches:
-            branch_name = untagged_child_version_branches[child_version]
-            print(f"Using {branch_name!r} branch instead of version {child_version}.")
-            checkout_version(branch_name, capture_output=not verbose)
-        else:
-            checkout_version(child_version, capture_output=not verbose)
+        try:
+            if untagged_child_version_branches and child_version in untagged_child_version_branches:
+                branch_name = untagged_child_version_branches[child_version]
+                print(f"Using {branch_name!r} branch instead of version {child_version}.")
+                checkout_version(branch_name, capture_output=not verbose)
+            else:
+                checkout_version(child_version, capture_output=not verbose)
+        except ChildProcessError as error:
+            print(error)
+            failed_child_versions.append(child_version)
+            _emit_skipped_cells(selected_questions, child_version)
+            continue
 
-        install_version(child_version, capture_output=not verbose)
+        cell_keys = [None] * len(selected_questions)
+        cached_entries = [None] * len(selected_questions)
 
-        for question in questions:
-            parent_sdk_version = json.loads(question)["parent_sdk_version"]
+        if outcome_cache:
+            environment_hash = get_environment_hash()
 
-            if verbose and parent_sdk_version not in parent_versions:
-                print(f"Version {parent_sdk_version!r} not included in {parent_versions!r}.")
-                continue
+            for index, (_, deserialised_question) in enumerate(selected_questions):
+                cell_keys[index] = get_cell_key(
+                    deserialised_question, environment_hash, get_answering_mode(concurrent_questions)
+                )
+                cached_entries[index] = outcome_cache.get(cell_keys[index])
 
-            with tempfile.NamedTemporaryFile() as temporary_file:
-                with open(temporary_file.name, "w") as f:
-                    f.write(question)
+        environment_path = None
+        environment_directory = None
 
-                process = run_command_in_poetry_environment(
-                    f"python {QUESTION_PROCESSING_SCRIPT_PATH} {temporary_file.name} {results_file_path} {child_version}",
+        # Always remove the materialised environment, even if processing the child version's questions fails.
+        try:
+            if all(cached_entries):
+                print("All questions have cached outcomes in this version; skipping installation.")
+            else:
+                try:
+                    snapshot_path = None
+
+                    if snapshots_directory:
+                        snapshot_path = get_environment_snapshot_path(snapshots_directory, child_version)
+
+                    install_version(child_version, capture_output=not verbose, snapshot_path=snapshot_path)
+                except ChildProcessError as error:
+                    print(error)
+                    failed_child_versions.append(child_version)
+                    _emit_skipped_cells(selected_questions, child_version)
+                    continue
+
+                if snapshot_path:
+                    # Materialise the environment next to the snapshot so it can be hardlinked or reflinked.
+                    environment_directory = tempfile.mkdtemp(dir=snapshots_directory, prefix=".environment-")
+                    environment_path = materialise_environment_snapshot(
+                        snapshot_path, os.path.join(environment_directory, "environment")
+                    )
+
+                    precompile_bytecode(
+                        os.path.join(snapshot_path, "source", "octue"), environment_path=environment_path
+                    )
+                else:
+                    precompile_bytecode()
+
+            predicted_outcomes = [None] * len(selected_questions)
+
+            if predict and not all(cached_entries):
+                predicted_outcomes = _predict_outcomes(
+                    questions,
+                    selected_questions,
+                    cached_entries,
+                    child_version,
+                    timeout,
+                    environment_path,
+                    predictions_file_path,
                 )
 
-                if process.returncode != 0:
-                    print(
-                        f"Questions from parent SDK version {parent_sdk_version} maybe be incompatible with child SDK "
-                        f"version {child_version}.\n{process.stdout or ''}\n{process.stderr or ''}"
+            concurrent_outcomes = {}
+
+            if concurrent_questions:
+                uncached_questions = [
+                    (index, selected_question)
+                    for index, (selected_question, cached_entry, predicted_outcome) in enumerate(
+                        zip(selected_questions, cached_entries, predicted_outcomes)
+                    )
+                    if not cached_entry and not predicted_outcome
+                ]
+
+                for _, (_, deserialised_question) in uncached_questions:
+                    _emit_cell_started(deserialised_question, child_version)
+
+                concurrent_outcomes = dict(
+                    zip(
+                        [index for index, _ in uncached_questions],
+                        _process_questions_concurrently(
+                            [selected_question for _, selected_question in uncached_questions],
+                            child_version,
+                            results_file_path,
+                            concurrent_questions,
+                            timeout,
+                            environment_path,
+                        ),
+                    )
+                )
+
+            for index, ((question, deserialised_question), cell_key, cached_entry, predicted_outcome) in enumerate(
+                zip(selected_questions, cell_keys, cached_entries, predicted_outcomes)
+            ):
+                parent_sdk_version = deserialised_question["parent_sdk_version"]
+                size_class = deserialised_question.get("size_class")
+
+                if cached_entry:
+                    outcome = cached_entry["outcome"]
+                    measurements = cached_entry["measurements"]
+                    answers = cached_entry["answers"]
+                    duration = 0
+
+                    if not size_class:
+                        save_result(
+                            results_file_path, parent_sdk_version, child_version, compatible=outcome == "compatible"
+                        )
+
+                elif predicted_outcome:
+                    outcome = predicted_outcome
+                    measurements = {}
+                    answers = []
+                    duration = 0
+                    save_result(
+                        results_file_path, parent_sdk_version, child_version, compatible=outcome == "compatible"
+                    )
+
+                else:
+                    if index in concurrent_outcomes:
+                        outcome, measurements, answers = concurrent_outcomes[index]
+                    else:
+                        _emit_cell_started(deserialised_question, child_version)
+                        outcome, measurements, answers = _process_question(
+                            question,
+                            deserialised_question,
+                            child_version,
+                            results_file_path,
+                            timeout,
+                            environment_path,
+                        )
+
+                    duration = measurements.get("wall_time", 0)
+
+                    if outcome_cache and outcome in CACHEABLE_OUTCOMES:
+                        outcome_cache.set(
+                            cell_key, {"outcome": outcome, "measurements": measurements, "answers": answers}
+                        )
+
+                if performance_file_path and not predicted_outcome:
+                    save_performance(
+                        performance_file_path,
+                        parent_sdk_version,
+                        child_version,
+                        size_class=size_class or DEFAULT_SIZE_CLASS,
+                        measurements=measurements,
                     )
+
+                if answers_file_path and answers:
+                    save_answers(answers_file_path, answers)
+
+                emit(
+                    "cell_finished",
+                    parent=parent_sdk_version,
+                    child=child_version,
+                    size_class=size_class or DEFAULT_SIZE_CLASS,
+                    outcome=outcome,
+                    duration=duration,
+                    cached=bool(cached_entry),
+                    predicted=bool(predicted_outcome),
+                )
+        finally:
+            if environment_directory:
+                shutil.rmtree(environment_directory)
+
+    emit("run_finished")
+
+    if failed_child_versions:
+        raise ChildProcessError(
+            f"These child versions couldn't be checked out or installed: {failed_child_versions!r}."
+        )
+
+
+def get_question_id(question):
+    """Get the ID of a recorded question. This is the UUID the parent gave the question when asking it.
+
+    :param dict question: a deserialised recorded question
+    :return str:
+    """
+    return question["question"]["attributes"]["question_uuid"]
+
+
+def _process_question(
+    question, deserialised_question, child_version, results_file_path, timeout, environment_path=None
+):
+    """Process a question in a worker process running in the installed child version's poetry environment.
+
+    :param str question: the serialised recorded question
+    :param dict deserialised_question:
+    :param str child_version:
+    :param str results_file_path:
+    :param float|None timeout:
+    :param str|None environment_path: if given, process the question in this environment instead of the poetry environment
+    :return (str, dict, list(str)): the outcome, the performance measurements, and the JSONL lines of the child's recorded answer (if the question was processed successfully)
+    """
+    parent_sdk_version = deserialised_question["parent_sdk_version"]
+
+    # The worker records its answer and measurements to temporary files so they can be cached with the outcome.
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        question_path = os.path.join(temporary_directory, "question.json")
+        answers_path = os.path.join(temporary_directory, "answers.jsonl")
+        performance_path = os.path.join(temporary_directory, "performance.json")
+
+        with open(question_path, "w") as f:
+            f.write(question)
+
+        process, resources = run_measured_command_in_poetry_environment(
+            f"python {QUESTION_PROCESSING_SCRIPT_PATH} {question_path} {results_file_path} {child_version} "
+            f"--answers-file {answers_path} --performance-file {performance_path}",
+            timeout=timeout,
+            environment_path=environment_path,
+        )
+
+        try:
+            with open(performance_path) as f:
+                size_class = deserialised_question.get("size_class", DEFAULT_SIZE_CLASS)
+                measurements = json.load(f)[parent_sdk_version][child_version][size_class]
+        except (FileNotFoundError, KeyError):
+            measurements = {}
+
+        try:
+            with open(answers_path) as f:
+                answers = f.readlines()
+        except FileNotFoundError:
+            answers = []
+
+    measurements.update(resources)
+
+    if resources["timed_out"]:
+        outcome = "timeout"
+        print(
+            f"Processing a question from parent SDK version {parent_sdk_version} in child SDK version {child_version} "
+            f"timed out after {timeout} seconds."
+        )
+
+    elif process.returncode != 0:
+        outcome = "incompatible"
+        print(
+            f"Questions from parent SDK version {parent_sdk_version} maybe be incompatible with child SDK version "
+            f"{child_version}.\n{process.stdout or ''}\n{process.stderr or ''}"
+        )
+
+    else:
+        outcome = "compatible"
+
+    return outcome, measurements, answers
+
+
+def _predict_outcomes(
+    questions,
+    selected_questions,
+    cached_entries,
+    child_version,
+    timeout,
+    environment_path=None,
+    predictions_file_path=None,
+):
+    """Predict the outcomes of the uncached questions not generated for a size class from their shapes. The child version
+    is probed with the question recorded from the same version. If there isn't one or the probe fails, no outcomes are
+    predicted. Only predicted incompatibilities are returned, so questions predicted to be compatible are still processed.
+    This is because a shape can show that a question is missing a key the child requires, but not that its values will
+    be understood.
+
+    :param list(str) questions: all the serialised recorded questions
+    :param list(tuple(str, dict)) selected_questions: the serialised and deserialised questions selected for processing
+    :param list(dict|None) cached_entries: the cache entry of each selected question, if there is one
+    :param str child_version:
+    :param float|None timeout: if given, the maximum number of seconds to let each variant of the probe take
+    :param str|None environment_path: if given, probe the child in this environment instead of the poetry environment
+    :param str|None predictions_file_path: if given, record the results of the questions predicted to be incompatible to this JSON file
+    :return list(str|None): "incompatible" for each selected question predicted to be incompatible and `None` for the rest
+    """
+    predicted_outcomes = [None] * len(selected_questions)
+
+    predictable_indices = [
+        index
+        for index, ((_, deserialised_question), cached_entry) in enumerate(zip(selected_questions, cached_entries))
+        if not cached_entry and not deserialised_question.get("size_class")
+    ]
+
+    if not predictable_indices:
+        return predicted_outcomes
+
+    reference_question = None
+
+    for question in questions:
+        deserialised_question = json.loads(question)
+
+        if deserialised_question["parent_sdk_version"] == child_version and not deserialised_question.get("size_class"):
+            reference_question = deserialised_question
+            break
+
+    if not reference_question:
+        print(f"No question was recorded from version {child_version} to probe it with; processing all its questions.")
+        return predicted_outcomes
+
+    profile = _probe_child(reference_question, child_version, timeout, environment_path)
+
+    if not profile or not profile["reference_compatible"]:
+        print(f"Probing version {child_version} failed; processing all its questions.")
+        return predicted_outcomes
+
+    for index in predictable_indices:
+        deserialised_question = selected_questions[index][1]
+        predicted_outcome = predict_outcome(get_question_shape(deserialised_question), profile)
+
+        if predicted_outcome != "incompatible":
+            continue
+
+        predicted_outcomes[index] = predicted_outcome
+
+        if predictions_file_path:
+            save_result(predictions_file_path, deserialised_question["parent_sdk_version"], child_version, compatible=False)
+
+    number_of_predicted_incompatibilities = len([outcome for outcome in predicted_outcomes if outcome])
+
+    print(
+        f"Predicted {number_of_predicted_incompatibilities} of {len(predictable_indices)} questions to be incompatible "
+        f"from their shapes; processing the rest."
+    )
+
+    return predicted_outcomes
+
+
+def _probe_child(reference_question, child_version, timeout, environment_path=None):
+    """Probe the keys the installed child version requires in questions in a worker process running in its poetry
+    environment (see `probe_child.py`).
+
+    :param dict reference_question: a deserialised recorded question to create the variants of the probe from
+    :param str child_version:
+    :param float|None timeout: if given, the maximum number of seconds to let each variant of the probe take
+    :param str|None environment_path: if given, probe the child in this environment instead of the poetry environment
+    :return dict|None: the child's profile (see `schemas.create_child_profile`), or `None` if the probe failed
+    """
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        question_path = os.path.join(temporary_directory, "question.json")
+        profile_path = os.path.join(temporary_directory, "profile.json")
+
+        with open(question_path, "w") as f:
+            json.dump(reference_question, f)
+
+        command = f"python {CHILD_PROBING_SCRIPT_PATH} {question_path} {profile_path}"
+
+        if timeout:
+            command += f" --variant-timeout {timeout}"
+
+        # Bound the whole worker process in case it hangs outside of answering the variants.
+        process, _ = run_measured_command_in_poetry_environment(
+            command,
+            timeout=timeout * len(get_probe_variants(reference_question)) if timeout else None,
+            environment_path=environment_path,
+        )
+
+        try:
+            with open(profile_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            print(f"Probing child SDK version {child_version} failed.\n{process.stdout or ''}\n{process.stderr or ''}")
+            return None
+
+
+def _process_questions_concurrently(
+    questions,
+    child_version,
+    results_file_path,
+    concurrent_questions,
+    timeout,
+    environment_path=None,
+):
+    """Process a batch of questions concurrently in a single worker process running in the installed child version's
+    poetry environment. If the worker process fails before reporting a question's outcome, the question is processed
+    again in its own worker process (or marked as timed out if the whole worker timed out) rather than being assumed to
+    be incompatible. No answers are recorded in this mode.
+
+    :param list(tuple(str, dict)) questions: the serialised and deserialised recorded questions
+    :param str child_version:
+    :param str results_file_path:
+    :param int concurrent_questions: the maximum number of questions to answer at once
+    :param float|None timeout: the maximum number of seconds to let each question take
+    :param str|None environment_path: if given, process the questions in this environment instead of the poetry environment
+    :return list(tuple(str, dict, list(str))): the outcome, the performance measurements, and the JSONL lines of the child's recorded answer for each question
+    """
+    if not questions:
+        return []
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        questions_path = os.path.join(temporary_directory, "questions.jsonl")
+        outcomes_path = os.path.join(temporary_directory, "outcomes.jsonl")
+
+        with open(questions_path, "w") as f:
+            f.writelines(question if question.endswith("\n") else question + "\n" for question, _ in questions)
+
+        command = (
+            f"python {QUESTION_PROCESSING_SCRIPT_PATH} {questions_path} {results_file_path} {child_version} "
+            f"--concurrent-questions {concurrent_questions} --outcomes-file {outcomes_path}"
+        )
+
+        if timeout:
+            command += f" --question-timeout {timeout}"
+
+        # Bound the whole worker process in case it hangs outside of answering the questions.
+        process, resources = run_measured_command_in_poetry_environment(
+            command,
+            timeout=timeout * len(questions) if timeout else None,
+            environment_path=environment_path,
+        )
+
+        outcomes = {}
+
+        # Outcomes are appended as each question finishes, so those reported before the worker was killed are kept. A
+        # line without a newline was cut off by the kill.
+        try:
+            with open(outcomes_path) as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        outcome = json.loads(line)
+                        outcomes[outcome.pop("question_uuid")] = outcome
+        except FileNotFoundError:
+            pass
+
+    if process.returncode != 0 and not outcomes:
+        print(
+            f"Processing questions concurrently in child SDK version {child_version} failed.\n{process.stdout or ''}\n"
+            f"{process.stderr or ''}"
+        )
+
+    results = []
+
+    for question, deserialised_question in questions:
+        outcome = outcomes.get(get_question_id(deserialised_question))
+
+        if outcome is None:
+            if resources["timed_out"]:
+                outcome = {"outcome": "timeout", "measurements": {}, "answers": []}
+            else:
+                # Answers aren't recorded in concurrent mode, even for questions processed again on their own.
+                rerun_outcome, measurements, _ = _process_question(
+                    question,
+                    deserialised_question,
+                    child_version,
+                    results_file_path,
+                    timeout,
+                    environment_path,
+                )
+
+                outcome = {"outcome": rerun_outcome, "measurements": measurements, "answers": []}
+
+        if outcome["outcome"] == "timeout":
+            print(
+                f"Processing a question from parent SDK version {deserialised_question['parent_sdk_version']} in child "
+                f"SDK version {child_version} timed out after {timeout} seconds."
+            )
+
+        results.append((outcome["outcome"], outcome["measurements"], outcome["answers"]))
+
+    return results
+
+
+def _emit_cell_started(deserialised_question, child_version):
+    """Emit an event for a question starting to be processed in a child version.
+
+    :param dict deserialised_question:
+    :param str child_version:
+    :return None:
+    """
+    emit(
+        "cell_started",
+        parent=deserialised_question["parent_sdk_version"],
+        child=child_version,
+        size_class=deserialised_question.get("size_class", DEFAULT_SIZE_CLASS),
+    )
+
+
+def _emit_skipped_cells(selected_questions, child_version):
+    """Emit events marking the cells for a child version that couldn't be checked out or installed as skipped.
+
+    :param list(tuple(str, dict)) selected_questions:
+    :param str child_version:
+    :return None:
+    """
+    for _, deserialised_question in selected_questions:
+        emit(
+            "cell_finished",
+            parent=deserialised_question["parent_sdk_version"],
+            child=child_version,
+            size_class=deserialised_question.get("size_class", DEFAULT_SIZE_CLASS),
+            outcome="skipped",
+            duration=0,
+        )
@@ -1,14 +1,8 @@
-import importlib.metadata
 import json
 import os
 import sys
 import tempfile
-from unittest.mock import patch
 
-from mocks import MockService
-from octue.resources import Manifest
-from octue.resources.service_backends import GCPPubSubBackend
-from octue.utils.encoders import OctueJSONEncoder
 from utils import ServicePatcher
 
 
@@ -20,13 +14,25 @@ class QuestionRecorder:
         self.question = {"data": data.decode(), "attributes": attributes}
 
 
-def record_question(recording_file_path):
+def record_question(recording_file_path, size_class=None):
     """Record a question produced by the current version of `octue` to the file at `RECORDING_FILE`. The question is
-    recorded at the point of publishing to Pub/Sub.
+    recorded at the point of publishing to Pub/Sub. If a size class is given, the question is generated with the size
+    class's number of datafiles, tag and label depth, and input values size (see `corpus.SIZE_CLASSES`) and the size
+    class is recorded with it.
 
     :param str recording_file_path:
+    :param str|None size_class: the name of a size class in `corpus.SIZE_CLASSES`
     :return None:
     """
+    import importlib.metadata
+
+    from corpus import create_input_values, create_nested_tag_value, get_question_parameters
+
+    from mocks import MockService
+    from octue.resources import Manifest
+    from octue.resources.service_backends import GCPPubSubBackend
+    from octue.utils.encoders import OctueJSONEncoder
+
     backend = GCPPubSubBackend(project_name="my-project")
     child = MockService(backend=backend)
 
@@ -35,19 +41,31 @@ def record_question(recording_file_path):
 
     parent = MockService(backend=backend, children={child.id: child})
 
+    parameters = get_question_parameters(size_class)
+
     with tempfile.TemporaryDirectory() as temporary_directory:
         os.mkdir(os.path.join(temporary_directory, "path-within-dataset"))
 
-        datafile_0_path = os.path.join(temporary_directory, "path-within-dataset", "a_test_file.csv")
-        with open(datafile_0_path, "w") as f:
-            f.write("blah")
+        if parameters["number_of_datafiles"] == 2:
+            datafile_names = ["a_test_file.csv", "another_test_file.csv"]
+        else:
+            datafile_names = [f"datafile_{index}.csv" for index in range(parameters["number_of_datafiles"])]
 
-        datafile_1_path = os.path.join(temporary_directory, "path-within-dataset", "another_test_file.csv")
-        with open(datafile_1_path, "w") as f:
-            f.write("blah")
+        for datafile_name in datafile_names:
+            with open(os.path.join(temporary_directory, "path-within-dataset", datafile_name), "w") as f:
+                f.write("blah")
 
         input_manifest = Manifest(datasets={"my_dataset": temporary_directory})
 
+        if parameters["number_of_tags"] or parameters["number_of_labels"]:
+            for datafile in input_manifest.datasets["my_dataset"].files:
+                datafile.tags = {
+                    f"tag_{index}": create_nested_tag_value(parameters["tag_depth"])
+                    for index in range(parameters["number_of_tags"])
+                }
+
+                datafile.labels = {f"label-{index}" for index in range(parameters["number_of_labels"])}
+
         service_patcher = ServicePatcher()
         publish_patch, question_recorder = _get_and_start_publish_patch()
         service_patcher.patches.append(publish_patch)
@@ -57,18 +75,21 @@ def record_question(recording_file_path):
 
             parent.ask(
                 child.id,
-                input_values={"height": 4, "width": 72},
+                input_values=create_input_values(parameters["input_values_size"]),
                 input_manifest=input_manifest,
                 allow_local_files=True,
             )
 
-        serialised_question = json.dumps(
-            {
-                "parent_sdk_version": importlib.metadata.version("octue"),
-                "question": question_recorder.question,
-            },
-            cls=OctueJSONEncoder,
-        )
+        recorded_question = {
+            "parent_sdk_version": importlib.metadata.version("octue"),
+            "question": question_recorder.question,
+        }
+
+        if size_class:
+            recorded_question["size_class"] = size_class
+            recorded_question["size_bytes"] = len(question_recorder.question["data"])
+
+        serialised_question = json.dumps(recorded_question, cls=OctueJSONEncoder)
 
         with open(recording_file_path, "a") as f:
             f.write(serialised_question + "\n")
@@ -81,6 +102,8 @@ def _get_and_start_publish_patch():
 
     :return (unittest.mock._patch, QuestionRecorder): the patch and the recorder are returned
     """
+    from unittest.mock import patch
+
     publish_patch = patch("mocks.MockPublisher.publish", QuestionRecorder())
     return publish_patch, publish_patch.start()
 
@@ -91,5 +114,11 @@ if __name__ == "__main__":
     else:
         recording_file_path = "recorded_questions.jsonl"
 
-    print(f"Creating and recording question to {os.path.abspath(recording_file_path)!r}...")
-    record_question(recording_file_path)
+    size_class = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if size_class:
+        print(f"Creating and recording {size_class!r} question to {os.path.abspath(recording_file_path)!r}...")
+    else:
+        print(f"Creating and recording question to {os.path.abspath(recording_file_path)!r}...")
+
+    record_question(recording_file_path, size_class)
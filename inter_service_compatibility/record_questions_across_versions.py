@@ -1,17 +1,32 @@
 import os
 
-from .utils import checkout_version, install_version, print_version_string, run_command_in_poetry_environment
+from .utils import (
+    checkout_version,
+    install_version,
+    precompile_bytecode,
+    print_version_string,
+    run_command_in_poetry_environment,
+)
 
 
 QUESTION_RECORDING_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "record_question.py")
 
 
-def record_questions_across_versions(octue_sdk_repo_path, parent_versions, recording_file_path, verbose=False):
+def record_questions_across_versions(
+    octue_sdk_repo_path,
+    parent_versions,
+    recording_file_path,
+    size_classes=None,
+    verbose=False,
+):
     """Checkout and install the given parent versions of the Octue SDK and record questions from them to the given file.
+    As well as the standard question, a question is generated and recorded for each of the given size classes to form a
+    corpus of questions of controlled sizes.
 
     :param str octue_sdk_repo_path:
     :param list parent_versions:
     :param str recording_file_path:
+    :param list(str)|None size_classes: the names of size classes in `corpus.SIZE_CLASSES` to generate questions for
     :param bool verbose:
     :return None:
     """
@@ -21,5 +36,14 @@ def record_questions_across_versions(octue_sdk_repo_path, parent_versions, recor
         print_version_string(parent_version, perspective="parent")
         checkout_version(parent_version, capture_output=not verbose)
         install_version(parent_version, capture_output=not verbose)
+        precompile_bytecode()
 
         run_command_in_poetry_environment(f"python {QUESTION_RECORDING_SCRIPT_PATH} {recording_file_path}")
+
+        for size_class in size_classes or []:
+            process = run_command_in_poetry_environment(
+                f"python {QUESTION_RECORDING_SCRIPT_PATH} {recording_file_path} {size_class}"
+            )
+
+            if process.returncode != 0:
+                print(f"Recording a {size_class!r} question from parent SDK version {parent_version} failed.")
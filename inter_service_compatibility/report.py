@@ -0,0 +1,218 @@
+import html
+import sys
+import time
+
+from .events import JSONLinesTailer
+from .utils import write_atomically
+from .versions import parse_version
+
+
+# The outcome shown for a cell with several questions (e.g. size classes) is the most severe one.
+OUTCOME_SEVERITIES = {"compatible": 0, "skipped": 1, "timeout": 2, "incompatible": 3}
+
+TERMINAL_STYLES = {
+    "compatible": ("\033[30;42m", "✓"),
+    "incompatible": ("\033[97;41m", "✗"),
+    "timeout": ("\033[30;43m", "T"),
+    "skipped": ("\033[97;100m", "-"),
+}
+
+HTML_COLOURS = {
+    "compatible": "#4caf50",
+    "incompatible": "#e53935",
+    "timeout": "#fbc02d",
+    "skipped": "#9e9e9e",
+}
+
+TERMINAL_RESET = "\033[0m"
+TERMINAL_CLEAR = "\033[2J\033[H"
+
+
+class MatrixReport:
+    """The state of the parent-child compatibility matrix of the latest run in a results log, built up incrementally from
+    the log's events.
+
+    :return None:
+    """
+
+    def __init__(self):
+        self.total_cells = None
+        self.started_at = None
+        self.finished = False
+        self.number_of_finished_cells = 0
+        self.cells = {}
+
+    @property
+    def parents(self):
+        return sorted({parent for parent, _ in self.cells}, key=parse_version, reverse=True)
+
+    @property
+    def children(self):
+        return sorted({child for _, child in self.cells}, key=parse_version, reverse=True)
+
+    def update(self, events):
+        """Update the report with new events from the results log. A "run_started" event resets the report so only the
+        latest run is shown.
+
+        :param iter(dict) events:
+        :return None:
+        """
+        for event in events:
+            if event["event"] == "run_started":
+                self.__init__()
+                self.total_cells = event["total_cells"]
+                self.started_at = event["time"]
+
+            elif event["event"] == "cell_finished":
+                self.number_of_finished_cells += 1
+                key = (event["parent"], event["child"])
+                current_outcome = self.cells.get(key)
+
+                if (
+                    current_outcome is None
+                    or OUTCOME_SEVERITIES[event["outcome"]] > OUTCOME_SEVERITIES[current_outcome]
+                ):
+                    self.cells[key] = event["outcome"]
+
+            elif event["event"] == "run_finished":
+                self.finished = True
+
+    def get_progress_summary(self, now=None):
+        """Summarise the progress of the run, including an estimate of the time remaining based on the average time taken
+        per cell so far (which includes the time spent installing versions).
+
+        :param float|None now: the current time in seconds since the epoch; defaults to the actual current time
+        :return str:
+        """
+        if self.total_cells is None:
+            return "Waiting for the run to start..."
+
+        summary = f"{self.number_of_finished_cells}/{self.total_cells} cells"
+
+        if self.total_cells:
+            summary += f" ({self.number_of_finished_cells / self.total_cells:.0%})"
+
+        if self.finished:
+            return summary + " - finished."
+
+        if not self.number_of_finished_cells:
+            return summary
+
+        seconds_per_cell = ((now or time.time()) - self.started_at) / self.number_of_finished_cells
+        remaining_seconds = seconds_per_cell * max(self.total_cells - self.number_of_finished_cells, 0)
+        minutes, seconds = divmod(int(remaining_seconds), 60)
+        return summary + f" - {seconds_per_cell:.1f}s per cell - ETA {minutes}m {seconds:02d}s"
+
+    def render_terminal_table(self):
+        """Render the matrix as a coloured table for a terminal. The rows are the parent versions and the columns are the
+        child versions.
+
+        :return str:
+        """
+        children = self.children
+        parent_column_width = max([len("parent \\ child")] + [len(parent) for parent in self.parents])
+        column_width = max([len(child) for child in children] + [1])
+
+        lines = [
+            " ".join(
+                ["parent \\ child".ljust(parent_column_width)] + [child.center(column_width) for child in children]
+            )
+        ]
+
+        for parent in self.parents:
+            row = [parent.ljust(parent_column_width)]
+
+            for child in children:
+                outcome = self.cells.get((parent, child))
+
+                if outcome is None:
+                    row.append(" " * column_width)
+                    continue
+
+                style, symbol = TERMINAL_STYLES[outcome]
+                row.append(style + symbol.center(column_width) + TERMINAL_RESET)
+
+            lines.append(" ".join(row))
+
+        legend = "  ".join(
+            f"{style} {symbol} {TERMINAL_RESET} {outcome}" for outcome, (style, symbol) in TERMINAL_STYLES.items()
+        )
+        return "\n".join(lines + ["", legend, self.get_progress_summary()])
+
+    def render_html(self):
+        """Render the matrix as a static HTML page. The rows are the parent versions and the columns are the child
+        versions.
+
+        :return str:
+        """
+        children = self.children
+        header = "".join(f"<th>{html.escape(child)}</th>" for child in children)
+        rows = []
+
+        for parent in self.parents:
+            cells = []
+
+            for child in children:
+                outcome = self.cells.get((parent, child))
+
+                if outcome is None:
+                    cells.append("<td></td>")
+                else:
+                    cells.append(
+                        f'<td class="{outcome}" title="{html.escape(parent)} → {html.escape(child)}: {outcome}"></td>'
+                    )
+
+            rows.append(f"<tr><th>{html.escape(parent)}</th>{''.join(cells)}</tr>")
+
+        styles = "".join(
+            f"td.{outcome}, span.{outcome} {{background: {colour};}}" for outcome, colour in HTML_COLOURS.items()
+        )
+        legend = " ".join(f'<span class="{outcome}">&nbsp;&nbsp;&nbsp;</span> {outcome}' for outcome in HTML_COLOURS)
+
+        return (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            "<title>Octue SDK version compatibility</title>\n"
+            "<style>body {font-family: sans-serif;} table {border-collapse: collapse;} "
+            "th, td {border: 1px solid #ddd; padding: 2px 4px; font-size: 12px;} "
+            f"td {{min-width: 14px;}} {styles}</style>\n"
+            "</head>\n<body>\n<h1>Octue SDK version compatibility</h1>\n"
+            f"<p>{html.escape(self.get_progress_summary())}</p>\n<p>{legend}</p>\n"
+            "<p>Rows are parent versions and columns are child versions.</p>\n"
+            f"<table>\n<tr><th>parent \\ child</th>{header}</tr>\n" + "\n".join(rows) + "\n</table>\n</body>\n</html>\n"
+        )
+
+
+def report_results(results_log_path, html_file_path=None, follow=True, refresh_interval=2, output=sys.stdout):
+    """Render the compatibility matrix of the latest run in the results log to the terminal and, optionally, an HTML
+    file. Only new events are read from the log on each refresh. If following, the report is refreshed whenever new
+    events are appended until the run finishes.
+
+    :param str results_log_path:
+    :param str|None html_file_path: if given, write the matrix to this HTML file on each refresh
+    :param bool follow: if `True`, keep refreshing the report until the run finishes
+    :param float refresh_interval: the number of seconds to wait between checking for new events
+    :param io.TextIOBase output: the stream to render the terminal table to
+    :return MatrixReport:
+    """
+    tailer = JSONLinesTailer(results_log_path)
+    report = MatrixReport()
+    clear_screen = follow and output.isatty()
+    first_render = True
+
+    while True:
+        events = tailer.read_new_events()
+        report.update(events)
+
+        if events or first_render:
+            output.write((TERMINAL_CLEAR if clear_screen else "") + report.render_terminal_table() + "\n")
+            output.flush()
+
+            if html_file_path:
+                write_atomically(html_file_path, report.render_html())
+
+            first_render = False
+
+        if not follow or report.finished:
+            return report
+
+        time.sleep(refresh_interval)
@@ -0,0 +1,327 @@
+"""Static extraction of the shapes of recorded questions and prediction of whether a child can parse a question from its
+shape alone. A question's shape maps the path of each key in its attributes and data (including the keys of its input
+manifest) to the JSON type of its value. Paths are joined with "." and:
+- The names of datasets are replaced with "*" so questions with differently named datasets have the same shape
+- The items of arrays are merged under "[]"
+- Free-form values (e.g. input values and the tags and labels of datafiles) aren't descended into
+
+A child's requirements are found by a single cheap probe per child version (see `probe_child.py`) that answers variants
+of a reference question in one served child: the reference question itself, the question with each key removed in turn,
+and the question with an unknown key added to each section. From the outcomes, the child's profile records which keys it
+requires and whether it tolerates unknown keys. A question can then be predicted to be compatible or incompatible with
+the child without processing it, or found to be ambiguous if its shape differs from the reference question's in a way
+the probe didn't cover. Predictions only consider the shapes of questions, not their values.
+
+This module only uses the standard library so it can be imported by both the orchestration code and the worker scripts.
+"""
+
+import copy
+import json
+
+
+SEPARATOR = "."
+ANY_KEY = "*"
+ANY_ITEM = "[]"
+MIXED_TYPE = "mixed"
+
+# Data keys whose values are sometimes serialised to a JSON string within the data (depending on the version).
+SERIALISED_KEYS = ("input_manifest",)
+NAMED_ITEM_KEYS = {"datasets"}
+FREE_FORM_KEYS = {"input_values", "tags", "labels"}
+
+# The sections of a question an unknown key is added to by the probe.
+SECTIONS = ("attributes", "data", "data.input_manifest")
+PROBE_KEY = "octue_compatibility_probe"
+
+
+def get_question_shape(question):
+    """Get the shape of a recorded question.
+
+    :param dict question: a deserialised recorded question
+    :return dict: the JSON type of the value at each key path in the question
+    """
+    message, serialised_keys = _unpack(question)
+    shape = {}
+
+    for section, value in message.items():
+        _add_to_shape(value, [section], shape)
+
+    for key in serialised_keys:
+        shape[f"data{SEPARATOR}{key}"] = f"serialised {shape[f'data{SEPARATOR}{key}']}"
+
+    return shape
+
+
+def get_question_shapes(recording_file_path):
+    """Get the shape of the question recorded from each parent version in a recording file. Questions generated for a
+    size class are ignored.
+
+    :param str recording_file_path: the path to a JSONL (JSON lines) file of recorded questions
+    :return dict: the question shape of each parent version
+    """
+    shapes = {}
+
+    with open(recording_file_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            question = json.loads(line)
+
+            if not question.get("size_class"):
+                shapes[question["parent_sdk_version"]] = get_question_shape(question)
+
+    return shapes
+
+
+def get_probe_variants(question):
+    """Get the variants of a reference question that a child answers to probe its requirements.
+
+    :param dict question: a deserialised recorded question the child is expected to be able to answer
+    :return list(tuple(str, str|None, dict)): the kind of each variant ("reference", "removed", or "extra"), the key path removed or the section added to, and the variant itself
+    """
+    variants = [("reference", None, copy.deepcopy(question))]
+
+    for path in get_question_shape(question):
+        if path in {"attributes", "data"}:
+            continue
+
+        message, serialised_keys = _unpack(question)
+        _remove_path(message, path.split(SEPARATOR))
+        variants.append(("removed", path, _pack(question, message, serialised_keys)))
+
+    for section in SECTIONS:
+        message, serialised_keys = _unpack(question)
+        container = _get_container(message, section.split(SEPARATOR))
+
+        if not isinstance(container, dict):
+            continue
+
+        container[PROBE_KEY] = PROBE_KEY
+        variants.append(("extra", section, _pack(question, message, serialised_keys)))
+
+    return variants
+
+
+def create_child_profile(question, probe_outcomes):
+    """Create a child's profile from the outcomes of answering the variants of a reference question.
+
+    :param dict question: the reference question the variants were created from
+    :param list(dict) probe_outcomes: the kind, target, and outcome ("compatible", "incompatible", or "timeout") of each variant from `get_probe_variants`
+    :return dict: the child's profile
+    """
+    profile = {
+        "reference_compatible": False,
+        "reference_shape": get_question_shape(question),
+        "required": [],
+        "undetermined": [],
+        "tolerates_extra": {},
+    }
+
+    for probe_outcome in probe_outcomes:
+        kind, target, outcome = probe_outcome["kind"], probe_outcome["target"], probe_outcome["outcome"]
+
+        if kind == "reference":
+            profile["reference_compatible"] = outcome == "compatible"
+
+        elif kind == "removed":
+            if outcome == "incompatible":
+                profile["required"].append(target)
+            elif outcome == "timeout":
+                profile["undetermined"].append(target)
+
+        elif kind == "extra" and outcome != "timeout":
+            profile["tolerates_extra"][target] = outcome == "compatible"
+
+    return profile
+
+
+def predict_outcome(question_shape, profile):
+    """Predict the outcome of a child processing a question from the question's shape and the child's profile.
+
+    The question is predicted to be incompatible if it's missing a key the child requires or has an unknown key in a
+    section where the child doesn't tolerate unknown keys. It's predicted to be compatible if it has all the keys the
+    child requires, its other keys have the same types as in the reference question, and any unknown keys are in
+    sections where the child tolerates them. Otherwise, it's ambiguous and must be processed to find its outcome.
+
+    :param dict question_shape: the shape of the question from `get_question_shape`
+    :param dict profile: the child's profile from `create_child_profile`
+    :return str|None: "compatible", "incompatible", or `None` if the outcome is ambiguous
+    """
+    if not profile["reference_compatible"]:
+        return None
+
+    reference_shape = profile["reference_shape"]
+
+    for path in profile["required"]:
+        # A required key within e.g. an empty array or an omitted optional key doesn't need to be present.
+        if path not in question_shape and path.rpartition(SEPARATOR)[0] in question_shape:
+            return "incompatible"
+
+    if any(path not in question_shape for path in profile["undetermined"]):
+        return None
+
+    unknown_paths = set()
+
+    for path, type_name in question_shape.items():
+        if path not in reference_shape:
+            unknown_paths.add(path)
+        elif reference_shape[path] != type_name:
+            return None
+
+    for path in unknown_paths:
+        parent_path = path.rpartition(SEPARATOR)[0]
+
+        # Only the outermost unknown keys need to be tolerated.
+        if parent_path in unknown_paths:
+            continue
+
+        tolerates_extra = profile["tolerates_extra"].get(parent_path)
+
+        if tolerates_extra is None:
+            return None
+
+        if not tolerates_extra:
+            return "incompatible"
+
+    return "compatible"
+
+
+def _unpack(question):
+    """Get a copy of a recorded question's message with its data deserialised, including any data values that are
+    themselves serialised.
+
+    :param dict question: a deserialised recorded question
+    :return (dict, list(str)): the message's attributes and data, and the data keys that were serialised
+    """
+    data = json.loads(question["question"]["data"])
+    serialised_keys = []
+
+    for key in SERIALISED_KEYS:
+        if isinstance(data, dict) and isinstance(data.get(key), str):
+            try:
+                data[key] = json.loads(data[key])
+            except json.JSONDecodeError:
+                continue
+
+            serialised_keys.append(key)
+
+    return {"attributes": copy.deepcopy(question["question"]["attributes"]), "data": data}, serialised_keys
+
+
+def _pack(question, message, serialised_keys):
+    """Create a copy of a recorded question with the given message, reversing `_unpack`.
+
+    :param dict question: the recorded question the message was unpacked from
+    :param dict message:
+    :param list(str) serialised_keys:
+    :return dict:
+    """
+    data = message["data"]
+
+    for key in serialised_keys:
+        if key in data:
+            data[key] = json.dumps(data[key])
+
+    packed_question = copy.deepcopy({key: value for key, value in question.items() if key != "question"})
+    packed_question["question"] = {"data": json.dumps(data), "attributes": message["attributes"]}
+    return packed_question
+
+
+def _add_to_shape(value, path, shape):
+    """Add the type of a value and everything within it to a shape.
+
+    :param any value:
+    :param list(str) path: the key path of the value
+    :param dict shape:
+    :return None:
+    """
+    joined_path = SEPARATOR.join(path)
+    type_name = _get_type_name(value)
+    shape[joined_path] = type_name if shape.get(joined_path, type_name) == type_name else MIXED_TYPE
+
+    if path[-1] in FREE_FORM_KEYS:
+        return
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _add_to_shape(item, path + [ANY_KEY if path[-1] in NAMED_ITEM_KEYS else key], shape)
+
+    elif isinstance(value, list):
+        for item in value:
+            _add_to_shape(item, path + [ANY_ITEM], shape)
+
+
+def _get_type_name(value):
+    """Get the JSON type name of a value.
+
+    :param any value:
+    :return str:
+    """
+    if value is None:
+        return "null"
+
+    if isinstance(value, bool):
+        return "boolean"
+
+    if isinstance(value, (int, float)):
+        return "number"
+
+    if isinstance(value, str):
+        return "string"
+
+    if isinstance(value, list):
+        return "array"
+
+    return "object"
+
+
+def _get_container(value, path):
+    """Get the value at a key path containing no wildcards.
+
+    :param any value:
+    :param list(str) path:
+    :return any: the value, or `None` if there isn't one
+    """
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+
+        value = value[key]
+
+    return value
+
+
+def _remove_path(value, path):
+    """Remove the key at a key path from a value in place. Wildcards remove the key from every item they match.
+
+    :param any value:
+    :param list(str) path:
+    :return None:
+    """
+    key, remaining_path = path[0], path[1:]
+
+    if key not in {ANY_KEY, ANY_ITEM}:
+        if not isinstance(value, dict) or key not in value:
+            return
+
+        if not remaining_path:
+            del value[key]
+            return
+
+        items = [value[key]]
+
+    elif not remaining_path:
+        # Removing every item matched by a wildcard empties its container.
+        if isinstance(value, (dict, list)):
+            value.clear()
+
+        return
+
+    elif key == ANY_KEY:
+        items = list(value.values()) if isinstance(value, dict) else []
+    else:
+        items = value if isinstance(value, list) else []
+
+    for item in items:
+        _remove_path(item, remaining_path)
@@ -0,0 +1,98 @@
+import base64
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from utils import ServicePatcher
+
+
+logger = logging.getLogger(__name__)
+
+
+def serve_child(pair_name, number_of_questions=1, timeout=600):
+    """Serve a child running the current version of `octue` that answers questions received through the broker at the
+    address in the `OCTUE_MOCK_BROKER_ADDRESS` environment variable. The child's service ID is published to the pair's
+    rendezvous topic so a parent running in another process (see `ask_question.py`) can find it.
+
+    :param str pair_name: a name shared by the parent and child that's unique among the pairs using the broker
+    :param int number_of_questions: the number of questions to answer before stopping
+    :param float timeout: the maximum number of seconds to wait for the questions
+    :raise TimeoutError: if fewer than the given number of questions are received before the timeout
+    :return None:
+    """
+    from process_question import create_run_function
+
+    from mocks import MESSAGES, MockService, get_service_topic_name
+    from octue.resources import Manifest
+    from octue.resources.service_backends import GCPPubSubBackend
+
+    if isinstance(MESSAGES, dict):
+        raise EnvironmentError("The `OCTUE_MOCK_BROKER_ADDRESS` environment variable must be set to serve a child.")
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        os.mkdir(os.path.join(temporary_directory, "path-within-dataset"))
+
+        datafile_0_path = os.path.join(temporary_directory, "path-within-dataset", "a_test_file.csv")
+        with open(datafile_0_path, "w") as f:
+            f.write("blah")
+
+        datafile_1_path = os.path.join(temporary_directory, "path-within-dataset", "another_test_file.csv")
+        with open(datafile_1_path, "w") as f:
+            f.write("blah")
+
+        output_manifest = Manifest(datasets={"output_dataset": temporary_directory})
+
+        child = MockService(
+            backend=GCPPubSubBackend(project_name="octue-amy"),
+            run_function=create_run_function(output_manifest),
+        )
+
+        question_topic_name = get_service_topic_name(child.id)
+
+        with ServicePatcher():
+            child.serve()
+            MESSAGES[question_topic_name] = []
+
+            # Let the parent know which service ID to ask.
+            rendezvous_topic_name = get_rendezvous_topic_name(pair_name)
+            MESSAGES.client.create_topic(rendezvous_topic_name)
+            MESSAGES.client.publish(rendezvous_topic_name, child.id, attributes={})
+
+            number_of_questions_answered = 0
+            end_time = time.monotonic() + timeout
+
+            while number_of_questions_answered < number_of_questions:
+                if time.monotonic() > end_time:
+                    raise TimeoutError(
+                        f"Only {number_of_questions_answered} of {number_of_questions} questions were received within "
+                        f"{timeout} seconds."
+                    )
+
+                try:
+                    message = MESSAGES[question_topic_name].pop(0)
+                except IndexError:
+                    continue
+
+                # Encode the question data as it would be when received from Pub/Sub.
+                child.answer({"data": base64.b64encode(message.data), "attributes": message.attributes})
+                MESSAGES.acknowledge([message.ack_id])
+                number_of_questions_answered += 1
+
+
+def get_rendezvous_topic_name(pair_name):
+    """Get the name of the broker topic a child publishes its service ID to for the parent in the same pair.
+
+    :param str pair_name:
+    :return str:
+    """
+    return f"octue.compatibility.rendezvous.{pair_name}"
+
+
+if __name__ == "__main__":
+    pair_name = sys.argv[1]
+    number_of_questions = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    print(f"Serving child for pair {pair_name!r}...")
+    serve_child(pair_name, number_of_questions)
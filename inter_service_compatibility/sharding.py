@@ -0,0 +1,251 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+from .process_questions_across_versions import get_question_id, process_questions_across_versions
+from .utils import save_answers, write_atomically
+
+
+MANIFEST_FILENAME = "manifest.json"
+QUESTIONS_FILENAME = "questions.jsonl"
+LOCKS_DIRECTORY_NAME = "locks"
+FRAGMENTS_DIRECTORY_NAME = "fragments"
+
+
+def select_shard(child_versions, shard):
+    """Select the child versions in the given shard of the matrix. The matrix is split by child version so each shard
+    only installs the versions it processes.
+
+    :param list(str) child_versions:
+    :param str shard: the shard to select in the form "i/N" where `i` is between 1 and `N` inclusive (e.g. "2/4")
+    :raise ValueError: if the shard isn't in the right form
+    :return list(str):
+    """
+    try:
+        index, number_of_shards = (int(part) for part in shard.split("/"))
+    except ValueError:
+        raise ValueError(f"The shard must be in the form 'i/N' (e.g. '2/4'); received {shard!r}.")
+
+    if not 1 <= index <= number_of_shards:
+        raise ValueError(f"The shard index must be between 1 and {number_of_shards}; received {index}.")
+
+    return child_versions[index - 1 :: number_of_shards]
+
+
+def create_work_manifest(
+    shared_directory,
+    parent_versions,
+    child_versions,
+    recording_file_path,
+    untagged_child_version_branches=None,
+):
+    """Create a work manifest in the given shared directory for workers on any number of machines to claim units of work
+    from. There's one unit per child version containing the IDs of the questions to process in it, so each worker only
+    installs each version once. The questions file is copied into the shared directory so workers don't need their own
+    copy.
+
+    :param str shared_directory: a directory accessible to all workers (e.g. a network file system mount)
+    :param list parent_versions:
+    :param list child_versions:
+    :param str recording_file_path: the path to the JSONL (JSON lines) file containing recorded questions
+    :param dict|None untagged_child_version_branches: a mapping of untagged child versions to branch names
+    :raise FileExistsError: if the shared directory already contains a work manifest
+    :return dict: the work manifest
+    """
+    manifest_path = os.path.join(shared_directory, MANIFEST_FILENAME)
+
+    if os.path.exists(manifest_path):
+        raise FileExistsError(f"A work manifest already exists at {manifest_path!r}.")
+
+    with open(recording_file_path) as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    question_ids = [
+        get_question_id(question) for question in questions if question["parent_sdk_version"] in parent_versions
+    ]
+
+    if not question_ids:
+        raise ValueError(f"No questions from the given parent versions were found in {recording_file_path!r}.")
+
+    os.makedirs(os.path.join(shared_directory, LOCKS_DIRECTORY_NAME), exist_ok=True)
+    os.makedirs(os.path.join(shared_directory, FRAGMENTS_DIRECTORY_NAME), exist_ok=True)
+    shutil.copyfile(recording_file_path, os.path.join(shared_directory, QUESTIONS_FILENAME))
+
+    manifest = {
+        "untagged_child_version_branches": untagged_child_version_branches or {},
+        "units": [
+            {"id": f"unit-{index:04d}", "child_version": child_version, "question_ids": question_ids}
+            for index, child_version in enumerate(child_versions)
+        ],
+    }
+
+    write_atomically(manifest_path, json.dumps(manifest, indent=2))
+    return manifest
+
+
+def claim_next_unit(shared_directory, worker_id):
+    """Claim the next unclaimed unit of work from the work manifest in the shared directory. Units are claimed by
+    exclusively creating a lock file for them, so only one worker can claim each unit. To re-queue a unit whose worker
+    died, delete its lock file.
+
+    :param str shared_directory:
+    :param str worker_id: an identifier for the worker recorded in the lock file
+    :return dict|None: the claimed unit, or `None` if all units have been claimed
+    """
+    with open(os.path.join(shared_directory, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+
+    for unit in manifest["units"]:
+        lock_path = os.path.join(shared_directory, LOCKS_DIRECTORY_NAME, f"{unit['id']}.lock")
+
+        try:
+            file_descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            continue
+
+        with os.fdopen(file_descriptor, "w") as f:
+            json.dump({"worker_id": worker_id, "claimed_at": time.time()}, f)
+
+        return unit
+
+    return None
+
+
+def run_worker(
+    shared_directory,
+    octue_sdk_repo_path,
+    worker_id=None,
+    outcome_cache=None,
+    snapshots_directory=None,
+    verbose=False,
+):
+    """Claim and process units of work from the work manifest in the shared directory until none are left. The results
+    and answers for each unit are written to a fragment in the shared directory once the unit is finished. If a unit
+    fails (e.g. its child version can't be installed), the error is recorded in its fragment along with any results
+    from before the failure and the worker continues with the next unit.
+
+    :param str shared_directory:
+    :param str octue_sdk_repo_path:
+    :param str|None worker_id: an identifier for the worker; defaults to the hostname and process ID
+    :param inter_service_compatibility.outcome_cache.OutcomeCache|None outcome_cache: if given, reuse cached outcomes from this worker's machine and cache new ones in it
+    :param str|None snapshots_directory: if given, store and reuse snapshots of the child versions' environments in this local directory
+    :param bool verbose:
+    :return list(str): the IDs of the units processed by this worker
+    """
+    shared_directory = os.path.abspath(shared_directory)
+
+    # Processing a unit changes the working directory to the repository, so a relative path would break later units.
+    octue_sdk_repo_path = os.path.abspath(octue_sdk_repo_path)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    with open(os.path.join(shared_directory, MANIFEST_FILENAME)) as f:
+        untagged_child_version_branches = json.load(f)["untagged_child_version_branches"]
+
+    processed_unit_ids = []
+
+    while True:
+        unit = claim_next_unit(shared_directory, worker_id)
+
+        if unit is None:
+            return processed_unit_ids
+
+        print(f"\nWorker {worker_id!r} claimed {unit['id']} (child version {unit['child_version']}).")
+
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            results_path = os.path.join(temporary_directory, "results.json")
+            answers_path = os.path.join(temporary_directory, "answers.jsonl")
+            performance_path = os.path.join(temporary_directory, "performance.json")
+
+            fragment = {"unit_id": unit["id"], "worker_id": worker_id}
+
+            # A version that can't be checked out or installed shouldn't stop the worker processing other units.
+            try:
+                process_questions_across_versions(
+                    octue_sdk_repo_path=octue_sdk_repo_path,
+                    parent_versions=None,
+                    child_versions=[unit["child_version"]],
+                    recording_file_path=os.path.join(shared_directory, QUESTIONS_FILENAME),
+                    results_file_path=results_path,
+                    untagged_child_version_branches=untagged_child_version_branches,
+                    answers_file_path=answers_path,
+                    performance_file_path=performance_path,
+                    question_ids=set(unit["question_ids"]),
+                    outcome_cache=outcome_cache,
+                    snapshots_directory=snapshots_directory,
+                    verbose=verbose,
+                )
+            except ChildProcessError as error:
+                print(f"Worker {worker_id!r} failed to process {unit['id']}: {error}")
+                fragment["error"] = str(error)
+
+            fragment["results"] = _read_json(results_path, {})
+            fragment["performance"] = _read_json(performance_path, {})
+
+            try:
+                with open(answers_path) as f:
+                    fragment["answers"] = f.readlines()
+            except FileNotFoundError:
+                fragment["answers"] = []
+
+        fragment_path = os.path.join(shared_directory, FRAGMENTS_DIRECTORY_NAME, f"{unit['id']}.json")
+        write_atomically(fragment_path, json.dumps(fragment))
+        processed_unit_ids.append(unit["id"])
+
+
+def merge_result_fragments(shared_directory, results_file_path, answers_file_path=None, performance_file_path=None):
+    """Merge the result fragments written by workers into the standard results JSON file. If the results file already
+    exists, the fragments' results are added to it.
+
+    :param str shared_directory:
+    :param str results_file_path:
+    :param str|None answers_file_path: if given, append the answers recorded by the workers to this JSONL file
+    :param str|None performance_file_path: if given, merge the performance measurements recorded by the workers into this JSON file
+    :return (list(str), dict): the IDs of units in the work manifest that don't have a result fragment yet, and the error of each unit that failed
+    """
+    with open(os.path.join(shared_directory, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+
+    results = _read_json(results_file_path, {})
+    performance = _read_json(performance_file_path, {}) if performance_file_path else {}
+    missing_unit_ids = []
+    failed_units = {}
+
+    for unit in manifest["units"]:
+        fragment = _read_json(os.path.join(shared_directory, FRAGMENTS_DIRECTORY_NAME, f"{unit['id']}.json"), None)
+
+        if fragment is None:
+            missing_unit_ids.append(unit["id"])
+            continue
+
+        if "error" in fragment:
+            failed_units[unit["id"]] = fragment["error"]
+
+        for parent_sdk_version, row in fragment["results"].items():
+            results.setdefault(parent_sdk_version, {}).update(row)
+
+        for parent_sdk_version, row in fragment.get("performance", {}).items():
+            for child_sdk_version, size_classes in row.items():
+                performance.setdefault(parent_sdk_version, {}).setdefault(child_sdk_version, {}).update(size_classes)
+
+        if answers_file_path and fragment["answers"]:
+            save_answers(answers_file_path, fragment["answers"])
+
+    with open(results_file_path, "w") as f:
+        json.dump(results, f)
+
+    if performance_file_path:
+        with open(performance_file_path, "w") as f:
+            json.dump(performance, f)
+
+    return missing_unit_ids, failed_units
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
@@ -1,10 +1,34 @@
+import functools
+import io
+import json
 import os
+import re
+import resource
+import shutil
+import signal
+import socket
+import stat
 import subprocess
-from unittest.mock import patch
+import sys
+import tarfile
+import threading
+import time
+
+
+try:
+    from .events import emit
+except ImportError:
+    # The worker scripts import this module directly rather than as part of the package.
+    from events import emit
+
+
+SNAPSHOT_MANIFEST_FILENAME = "snapshot.json"
 
 
 class ServicePatcher:
     def __init__(self, patches=None):
+        from unittest.mock import patch
+
         from mocks import MockSubscriber, MockSubscription, MockTopic
 
         self.patches = patches or [
@@ -29,42 +53,513 @@ class ServicePatcher:
             p.stop()
 
 
+def get_peak_memory():
+    """Get the peak resident set size of the current process so far.
+
+    :return int: the peak memory in bytes
+    """
+    return _convert_max_rss_to_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _convert_max_rss_to_bytes(max_rss):
+    """Convert a peak resident set size from `resource.getrusage` or `os.wait4` to bytes.
+
+    :param int max_rss:
+    :return int:
+    """
+    # `ru_maxrss` is in bytes on macOS but kilobytes on Linux.
+    if sys.platform == "darwin":
+        return max_rss
+
+    return max_rss * 1024
+
+
 def print_version_string(version, perspective):
-    version_string = f"\n{perspective.upper()} VERSION {version}"
-    print(version_string)
-    print("=" * (len(version_string) - 1))
+    emit("version_started", version=version, perspective=perspective)
 
 
 def checkout_version(version, capture_output):
-    print("Checking out version...", end="", flush=False)
+    emit("version_checkout_started", version=version)
+    start_time = time.perf_counter()
     checkout_process = subprocess.run(["git", "checkout", version], capture_output=capture_output)
+    succeeded = checkout_process.returncode == 0
+    emit("version_checkout_finished", version=version, succeeded=succeeded, duration=time.perf_counter() - start_time)
 
-    if checkout_process.returncode != 0:
+    if not succeeded:
         raise ChildProcessError(
             f"Git checkout of version {version} failed.\n\n{checkout_process.stdout.decode()}\n\n"
             f"{checkout_process.stderr.decode()}"
         )
 
-    print("done.")
 
+def install_version(version, capture_output, snapshot_path=None):
+    """Install the checked-out version in the poetry environment. If a snapshot path is given, the installed environment
+    is stored there as an immutable snapshot (see `create_environment_snapshot`), or, if there's already a snapshot
+    there, the installation is skipped altogether. Run commands in a snapshot by materialising it with
+    `materialise_environment_snapshot` and passing the result to `run_command_in_poetry_environment`.
 
-def install_version(version, capture_output):
-    print("Installing version...", end="", flush=False)
+    :param str version:
+    :param bool capture_output:
+    :param str|None snapshot_path: the path to store or reuse an environment snapshot at
+    :raise ChildProcessError: if the installation fails
+    :return None:
+    """
+    emit("version_install_started", version=version)
+
+    if snapshot_path and os.path.exists(os.path.join(snapshot_path, SNAPSHOT_MANIFEST_FILENAME)):
+        emit("version_install_finished", version=version, succeeded=True, duration=0, from_snapshot=True)
+        return
+
+    start_time = time.perf_counter()
     install_process = subprocess.run(["poetry", "install", "--all-extras"], capture_output=capture_output)
 
     if install_process.returncode != 0:
+        emit(
+            "version_install_finished",
+            version=version,
+            succeeded=False,
+            duration=time.perf_counter() - start_time,
+            from_snapshot=False,
+        )
+
         raise ChildProcessError(
             f"Installation of version {version} failed.\n\n{install_process.stdout.decode()}\n\n"
             f"{install_process.stderr.decode()}"
         )
 
-    print("done.")
+    # The environment path can change if the new version requires a different Python version.
+    get_poetry_environment_path.cache_clear()
+
+    if snapshot_path:
+        create_environment_snapshot(snapshot_path)
+
+    emit(
+        "version_install_finished",
+        version=version,
+        succeeded=True,
+        duration=time.perf_counter() - start_time,
+        from_snapshot=False,
+    )
+
+
+def precompile_bytecode(octue_sdk_source_path="octue", environment_path=None):
+    """Compile the worker scripts, mocks, and the installed version's source to bytecode in the poetry environment so
+    the many short-lived worker processes don't each pay to compile them on import.
+
+    :param str octue_sdk_source_path: the path to the `octue` package source in the checked-out repository
+    :param str|None environment_path: if given, compile in this environment instead of the poetry environment
+    :return None:
+    """
+    run_command_in_poetry_environment(
+        f"python -m compileall -q {os.path.dirname(os.path.abspath(__file__))} {octue_sdk_source_path}",
+        environment_path=environment_path,
+        capture_output=True,
+    )
+
+
+def create_environment_snapshot(snapshot_path, octue_sdk_repo_path="."):
+    """Store the poetry environment of the checked-out version as an immutable snapshot. The snapshot contains a copy of
+    the environment and of the version's source (from `git archive`) with the environment's editable install pointed at
+    the snapshot's source, so the snapshot works without the repository being checked out at the same version. The
+    snapshot's files are made read-only so environments materialised from it by hardlinking can't modify it.
+
+    :param str snapshot_path:
+    :param str octue_sdk_repo_path: the path to the local clone of the `octue-sdk-python` repository
+    :raise ChildProcessError: if the source can't be archived
+    :return None:
+    """
+    octue_sdk_repo_path = os.path.abspath(octue_sdk_repo_path)
+    snapshot_path = os.path.abspath(snapshot_path)
+    temporary_snapshot_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    shutil.rmtree(temporary_snapshot_path, ignore_errors=True)
+
+    # Build the whole snapshot in a temporary directory and move it into place last so partially created snapshots are
+    # never used or left at the snapshot path.
+    try:
+        _build_environment_snapshot(temporary_snapshot_path, snapshot_path, octue_sdk_repo_path)
+    except BaseException:
+        shutil.rmtree(temporary_snapshot_path, ignore_errors=True)
+        raise
+
+    try:
+        os.rename(temporary_snapshot_path, snapshot_path)
+    except OSError:
+        if os.path.exists(os.path.join(snapshot_path, SNAPSHOT_MANIFEST_FILENAME)):
+            # Another worker created the snapshot first.
+            shutil.rmtree(temporary_snapshot_path)
+            return
+
+        # Replace an incomplete snapshot left by an interrupted run.
+        shutil.rmtree(snapshot_path)
+        os.rename(temporary_snapshot_path, snapshot_path)
+
+
+def _build_environment_snapshot(build_path, snapshot_path, octue_sdk_repo_path):
+    """Build an environment snapshot at the build path that will work once it's moved to the snapshot path.
+
+    :param str build_path: the path to build the snapshot at
+    :param str snapshot_path: the path the snapshot will be moved to
+    :param str octue_sdk_repo_path: the absolute path to the local clone of the `octue-sdk-python` repository
+    :raise ChildProcessError: if the source can't be archived
+    :return None:
+    """
+    shutil.copytree(get_poetry_environment_path(), os.path.join(build_path, "environment"), symlinks=True)
+
+    archive_process = subprocess.run(["git", "-C", octue_sdk_repo_path, "archive", "HEAD"], capture_output=True)
+
+    if archive_process.returncode != 0:
+        raise ChildProcessError(f"Archiving the source failed.\n\n{archive_process.stderr.decode()}")
+
+    with tarfile.open(fileobj=io.BytesIO(archive_process.stdout)) as archive:
+        archive.extractall(os.path.join(build_path, "source"))
+
+    _point_editable_installs_at(
+        os.path.join(build_path, "environment"),
+        old_source_path=octue_sdk_repo_path,
+        new_source_path=os.path.join(snapshot_path, "source"),
+    )
+
+    precompile_bytecode(
+        os.path.join(build_path, "source", "octue"),
+        environment_path=os.path.join(build_path, "environment"),
+    )
+
+    for directory_path, _, filenames in os.walk(build_path):
+        for filename in filenames:
+            path = os.path.join(directory_path, filename)
+
+            if not os.path.islink(path):
+                os.chmod(path, os.stat(path).st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+    with open(os.path.join(build_path, SNAPSHOT_MANIFEST_FILENAME), "w") as f:
+        json.dump({"created_at": time.time(), "source_path": octue_sdk_repo_path}, f)
+
+
+def materialise_environment_snapshot(snapshot_path, destination_path):
+    """Materialise a working environment from a snapshot for a worker. Where the filesystem supports it, the snapshot is
+    cloned copy-on-write (reflinked) so the new environment takes almost no disk space. Otherwise, a tree of hardlinks to
+    the snapshot's files is created or, as a last resort (e.g. if the destination is on a different filesystem), the
+    snapshot is copied.
+
+    :param str snapshot_path:
+    :param str destination_path: the path to materialise the environment at; this mustn't exist yet
+    :return str: the path of the materialised environment
+    """
+    source_path = os.path.join(snapshot_path, "environment")
+
+    reflink_process = subprocess.run(
+        ["cp", "-R", "-P", "--reflink=always", source_path, destination_path],
+        capture_output=True,
+    )
+
+    if reflink_process.returncode == 0:
+        return destination_path
+
+    shutil.rmtree(destination_path, ignore_errors=True)
+
+    try:
+        shutil.copytree(source_path, destination_path, symlinks=True, copy_function=os.link)
+    except (OSError, shutil.Error):
+        shutil.rmtree(destination_path, ignore_errors=True)
+        shutil.copytree(source_path, destination_path, symlinks=True)
+
+    return destination_path
+
+
+def get_environment_snapshot_path(snapshots_directory, version, octue_sdk_repo_path="."):
+    """Get the path of the environment snapshot for the checked-out version. Snapshots are identified by the version and
+    the hash of its source tree so a new snapshot is made when e.g. an untagged version's branch changes.
+
+    :param str snapshots_directory:
+    :param str version:
+    :param str octue_sdk_repo_path: the path to the local clone of the `octue-sdk-python` repository
+    :raise ChildProcessError: if the source tree hash can't be read from git
+    :return str:
+    """
+    tree_process = subprocess.run(
+        ["git", "-C", octue_sdk_repo_path, "rev-parse", "HEAD^{tree}"],
+        capture_output=True,
+    )
+
+    if tree_process.returncode != 0:
+        raise ChildProcessError(f"Getting the source tree hash failed.\n\n{tree_process.stderr.decode()}")
+
+    return os.path.join(os.path.abspath(snapshots_directory), f"{version}-{tree_process.stdout.decode().strip()[:16]}")
+
+
+def _point_editable_installs_at(environment_path, old_source_path, new_source_path):
+    """Rewrite the path files (and editable finder modules) in an environment's site packages that point at the old
+    source path to point at the new source path instead.
+
+    :param str environment_path:
+    :param str old_source_path:
+    :param str new_source_path:
+    :return None:
+    """
+    for directory_path, _, filenames in os.walk(os.path.join(environment_path, "lib")):
+        if os.path.basename(directory_path) != "site-packages":
+            continue
+
+        for filename in filenames:
+            if not (filename.endswith(".pth") or filename.startswith("__editable__")):
+                continue
+
+            path = os.path.join(directory_path, filename)
+
+            with open(path) as f:
+                contents = f.read()
+
+            if old_source_path in contents:
+                with open(path, "w") as f:
+                    f.write(contents.replace(old_source_path, new_source_path))
+
+
+@functools.lru_cache(maxsize=None)
+def get_poetry_environment_path():
+    """Get the path of the poetry environment. This is cached as asking poetry is slow and it's needed for every worker
+    process; the cache is cleared whenever a version is installed.
+
+    :return str:
+    """
+    return subprocess.run(["poetry", "env", "info", "--path"], capture_output=True).stdout.decode().strip()
 
 
 def get_poetry_environment_activation_script_path():
-    poetry_env_path = subprocess.run(["poetry", "env", "info", "--path"], capture_output=True).stdout.decode().strip()
-    return os.path.join(poetry_env_path, "bin", "activate")
+    """Get the path of the poetry environment's activation script.
+
+    :return str:
+    """
+    return os.path.join(get_poetry_environment_path(), "bin", "activate")
+
+
+def run_command_in_poetry_environment(command, environment_path=None, **kwargs):
+    """Run a shell command in the poetry environment or, if given, another environment (e.g. one materialised from a
+    snapshot).
+
+    :param str command:
+    :param str|None environment_path: if given, run the command in this environment instead of the poetry environment
+    :param kwargs: any keyword arguments for `subprocess.run`
+    :return subprocess.CompletedProcess:
+    """
+    command, environment_variables = _prepare_command(command, environment_path)
+    return subprocess.run(command, shell=True, env=environment_variables, **kwargs)
+
+
+def _prepare_command(command, environment_path=None):
+    """Prepare a shell command to run in the poetry environment or the given environment. The given environment is
+    activated by setting environment variables rather than by sourcing its activation script, which contains the path
+    the environment was originally created at.
+
+    :param str command:
+    :param str|None environment_path:
+    :return (str, dict|None): the command and the environment variables to run it with (`None` means the current ones)
+    """
+    if not environment_path:
+        return f"source {get_poetry_environment_activation_script_path()} && {command}", None
+
+    environment_variables = dict(os.environ)
+    environment_variables.pop("PYTHONHOME", None)
+    environment_variables["VIRTUAL_ENV"] = environment_path
+    environment_variables["PATH"] = os.pathsep.join([os.path.join(environment_path, "bin"), os.environ.get("PATH", "")])
+    return command, environment_variables
+
+
+def run_measured_command_in_poetry_environment(command, timeout=None, environment_path=None):
+    """Run a shell command in the poetry environment and measure the resources it uses. The measurements cover the whole
+    process tree (including interpreter startup and imports) and are taken with `os.wait4` so they don't add any
+    overhead to the command itself.
+
+    :param str command:
+    :param float|None timeout: if given, the maximum number of seconds to let the command run for before killing it
+    :param str|None environment_path: if given, run the command in this environment instead of the poetry environment
+    :return (subprocess.CompletedProcess, dict): the completed process and its wall time and CPU time in seconds, its peak memory in bytes, and whether it timed out
+    """
+    start_time = time.perf_counter()
+
+    # Start the command in a new session so the whole process tree can be killed if it times out.
+    command, environment_variables = _prepare_command(command, environment_path)
+    process = subprocess.Popen(command, shell=True, env=environment_variables, start_new_session=True)
+
+    # The kill is only sent while the command hasn't exited, so a command finishing just as its timeout expires isn't
+    # marked as timed out and its (possibly reused) process group ID is never signalled after it's been reaped.
+    lock = threading.Lock()
+    exited = False
+    killed = False
+
+    def kill():
+        nonlocal killed
+
+        with lock:
+            if exited:
+                return
+
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+                killed = True
+            except ProcessLookupError:
+                pass
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+
+    if timer:
+        timer.start()
+
+    try:
+        if hasattr(os, "waitid") and hasattr(os, "WNOWAIT"):
+            # Wait for the command to exit without reaping it so its process ID can't be reused until the kill is
+            # disabled.
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+
+            with lock:
+                exited = True
+
+            _, status, resource_usage = os.wait4(process.pid, 0)
+
+        else:
+            # `os.waitid` isn't available on macOS before Python 3.13, so the command is reaped straight away and the
+            # kill is disabled immediately afterwards.
+            _, status, resource_usage = os.wait4(process.pid, 0)
+
+            with lock:
+                exited = True
+    except BaseException:
+        # Don't leave the command running (e.g. if the orchestrator is interrupted).
+        kill()
+        raise
+    finally:
+        if timer:
+            timer.cancel()
+
+    wall_time = time.perf_counter() - start_time
+
+    # Let `Popen` know the process has been waited for.
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    resources = {
+        "wall_time": wall_time,
+        "cpu_time": resource_usage.ru_utime + resource_usage.ru_stime,
+        "max_rss": _convert_max_rss_to_bytes(resource_usage.ru_maxrss),
+        "timed_out": killed and os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGKILL,
+    }
+
+    return subprocess.CompletedProcess(process.args, process.returncode), resources
+
+
+def write_atomically(path, contents):
+    """Write to a temporary file in the same directory and then move it into place so readers never see a partially
+    written file.
+
+    :param str path:
+    :param str contents:
+    :return None:
+    """
+    temporary_path = f"{path}.{socket.gethostname()}-{os.getpid()}.tmp"
+
+    with open(temporary_path, "w") as f:
+        f.write(contents)
+
+    os.replace(temporary_path, path)
+
+
+def save_result(results_file_path, parent_sdk_version, child_sdk_version, compatible):
+    """Save whether a parent-child combination is compatible to the results file.
+
+    :param str results_file_path:
+    :param str parent_sdk_version:
+    :param str child_sdk_version:
+    :param bool compatible:
+    :return None:
+    """
+    try:
+        with open(results_file_path, "r") as f:
+            results = json.load(f)
+    except FileNotFoundError:
+        results = {}
+
+    parent_row = results.get(parent_sdk_version, {})
+
+    parent_row[child_sdk_version] = compatible
+    results[parent_sdk_version] = parent_row
+
+    with open(results_file_path, "w") as f:
+        json.dump(results, f)
+
+
+def save_answers(answers_file_path, answers):
+    """Save recorded answers to the answers file, replacing any existing answer from the same child version (e.g. from
+    an earlier push to an untagged version's branch). Every recorded answer is replayed into every parent version, so
+    one answer per child version is enough.
+
+    :param str answers_file_path: the path to a JSONL (JSON lines) file of recorded answers
+    :param list(str) answers: the JSONL lines of the answers to save
+    :return None:
+    """
+    try:
+        with open(answers_file_path) as f:
+            recorded_answers = [line for line in f if line.strip()]
+    except FileNotFoundError:
+        recorded_answers = []
+
+    new_answers = {}
+
+    for answer in answers:
+        new_answers.setdefault(json.loads(answer)["child_sdk_version"], answer.rstrip("\n") + "\n")
+
+    recorded_answers = [
+        answer for answer in recorded_answers if json.loads(answer)["child_sdk_version"] not in new_answers
+    ]
+
+    write_atomically(answers_file_path, "".join(recorded_answers + list(new_answers.values())))
+
+
+def save_performance(performance_file_path, parent_sdk_version, child_sdk_version, size_class, measurements):
+    """Add performance measurements for a parent-child combination and question size class to the performance file. The
+    file maps parent versions to child versions to size classes to measurements. Measurements are merged with any
+    already saved for the same combination and size class.
+
+    :param str performance_file_path:
+    :param str parent_sdk_version:
+    :param str child_sdk_version:
+    :param str size_class:
+    :param dict measurements:
+    :return None:
+    """
+    try:
+        with open(performance_file_path, "r") as f:
+            performance = json.load(f)
+    except FileNotFoundError:
+        performance = {}
+
+    performance.setdefault(parent_sdk_version, {}).setdefault(child_sdk_version, {}).setdefault(size_class, {}).update(
+        measurements
+    )
+
+    with open(performance_file_path, "w") as f:
+        json.dump(performance, f)
+
+
+def summarise_import_times(import_time_output, number_of_packages=10):
+    """Summarise the output of `python -X importtime` by totalling the cumulative import time of each top-level package.
+
+    :param str import_time_output: the stderr of a python process run with `-X importtime`
+    :param int number_of_packages: the number of most expensive top-level packages to include in the summary
+    :return dict: the total import time in seconds and the import times of the most expensive top-level packages
+    """
+    package_import_times = {}
+
+    for line in import_time_output.splitlines():
+        match = re.match(r"^import time:\s+\d+\s+\|\s+(\d+)\s+\|( *)(\S+)$", line)
+
+        # Only count modules imported directly (not as a dependency of another module) to avoid double counting.
+        if not match or len(match.group(2)) > 1:
+            continue
+
+        package = match.group(3).split(".")[0]
+        package_import_times[package] = package_import_times.get(package, 0) + int(match.group(1)) / 1e6
 
+    most_expensive_packages = sorted(package_import_times.items(), key=lambda item: item[1], reverse=True)
 
-def run_command_in_poetry_environment(command):
-    return subprocess.run(f"source {get_poetry_environment_activation_script_path()} && {command}", shell=True)
+    return {
+        "total": sum(package_import_times.values()),
+        "packages": dict(most_expensive_packages[:number_of_packages]),
+    }
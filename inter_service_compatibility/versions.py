@@ -0,0 +1,183 @@
+import functools
+import json
+import os
+import re
+import subprocess
+
+
+DEFAULT_VERSIONS_EXPRESSION = ">=0.30.0"
+VERSIONS_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".octue_sdk_versions_index.json")
+
+LATEST_MINOR_ONLY_KEYWORD = "latest-minor-only"
+RELEASED_VERSION_PATTERN = re.compile(r"^\d+\.\d+\.\d+$")
+COMPARISON_PATTERN = re.compile(r"^(>=|<=|==|!=|>|<)\s*(\d+(?:\.\d+){0,2})$")
+
+COMPARATORS = {
+    ">=": lambda version, bound: version >= bound,
+    "<=": lambda version, bound: version <= bound,
+    "==": lambda version, bound: version == bound,
+    "!=": lambda version, bound: version != bound,
+    ">": lambda version, bound: version > bound,
+    "<": lambda version, bound: version < bound,
+}
+
+
+def resolve_versions(expression, octue_sdk_repo_path, index_path=VERSIONS_INDEX_PATH):
+    """Resolve a versions expression to a list of versions, newest first. The expression is a comma-separated list of:
+    - Exact versions (e.g. "0.35.0") - these are always included as given
+    - Comparisons (e.g. ">=0.40", "<0.50") - released versions satisfying all of these are included. Missing minor or
+      patch numbers are taken to be zero
+    - The "latest-minor-only" keyword - only the latest patch of each minor version satisfying the comparisons is
+      included. If no comparisons are given, the default range is used
+
+    If the expression only contains exact versions, they're returned in the given order without reading any tags. If no
+    expression is given, all released versions from 0.30.0 upwards are used.
+
+    :param str|None expression: e.g. "0.35.0,0.36.0" or ">=0.40,<0.50,latest-minor-only"
+    :param str octue_sdk_repo_path: the path to a local clone of the `octue-sdk-python` repository
+    :param str index_path: the path to the versions index file used to cache the repository's released versions
+    :raise ValueError: if the expression contains an invalid term
+    :return list(str):
+    """
+    terms = [term.strip() for term in (expression or DEFAULT_VERSIONS_EXPRESSION).split(",") if term.strip()]
+
+    exact_versions = []
+    comparisons = []
+    latest_minor_only = False
+
+    for term in terms:
+        if term == LATEST_MINOR_ONLY_KEYWORD:
+            latest_minor_only = True
+            continue
+
+        if term[0] not in "<>=!":
+            exact_versions.append(term)
+            continue
+
+        match = COMPARISON_PATTERN.match(term)
+
+        if not match:
+            raise ValueError(f"{term!r} is not a valid version, comparison (e.g. '>=0.40'), or keyword.")
+
+        operator, bound = match.groups()
+        comparisons.append((COMPARATORS[operator], parse_version(bound)))
+
+    if not comparisons:
+        if not latest_minor_only:
+            return exact_versions
+
+        # Apply the default range to the keyword on its own.
+        operator, bound = COMPARISON_PATTERN.match(DEFAULT_VERSIONS_EXPRESSION).groups()
+        comparisons.append((COMPARATORS[operator], parse_version(bound)))
+
+    selected_versions = [
+        version
+        for version in get_released_versions(octue_sdk_repo_path, index_path=index_path)
+        if all(comparator(parse_version(version), bound) for comparator, bound in comparisons)
+    ]
+
+    if latest_minor_only:
+        selected_versions = _select_latest_patches(selected_versions)
+
+    for version in exact_versions:
+        if version not in selected_versions:
+            selected_versions.append(version)
+
+    return sorted(selected_versions, key=parse_version, reverse=True)
+
+
+def parse_version(version):
+    """Parse a semantic version (e.g. "0.35.0") to a tuple of three integers (e.g. `(0, 35, 0)`) that can be compared
+    with other parsed versions. Missing minor or patch numbers are taken to be zero and anything after the patch number
+    (e.g. a pre-release suffix) is ignored.
+
+    :param str version:
+    :return tuple(int, int, int):
+    """
+    numbers = [int(re.match(r"\d*", part).group() or 0) for part in version.split(".")[:3]]
+    return tuple(numbers + [0] * (3 - len(numbers)))
+
+
+@functools.lru_cache(maxsize=None)
+def get_released_versions(octue_sdk_repo_path, index_path=VERSIONS_INDEX_PATH):
+    """Get the released versions of the Octue SDK from the tags of the given repository, newest first. The versions are
+    cached in the versions index file and only read from the repository again if its tags have changed since.
+
+    :param str octue_sdk_repo_path: the path to a local clone of the `octue-sdk-python` repository
+    :param str index_path: the path to the versions index file
+    :return list(str):
+    """
+    octue_sdk_repo_path = os.path.abspath(octue_sdk_repo_path)
+    tags_signature = _get_tags_signature(octue_sdk_repo_path)
+
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = {}
+
+    entry = index.get(octue_sdk_repo_path)
+
+    if entry and tags_signature is not None and entry["tags_signature"] == tags_signature:
+        return entry["versions"]
+
+    tags_process = subprocess.run(["git", "-C", octue_sdk_repo_path, "tag", "--list"], capture_output=True)
+
+    if tags_process.returncode != 0:
+        raise ChildProcessError(
+            f"Listing the tags of the repository at {octue_sdk_repo_path!r} failed.\n\n{tags_process.stderr.decode()}"
+        )
+
+    versions = sorted(
+        (tag for tag in tags_process.stdout.decode().split() if RELEASED_VERSION_PATTERN.match(tag)),
+        key=parse_version,
+        reverse=True,
+    )
+
+    index[octue_sdk_repo_path] = {"tags_signature": tags_signature, "versions": versions}
+
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2)
+
+    return versions
+
+
+def _select_latest_patches(versions):
+    """Select only the latest patch of each minor version.
+
+    :param iter(str) versions:
+    :return list(str):
+    """
+    latest_patches = {}
+
+    for version in versions:
+        major, minor, _ = parse_version(version)
+        latest = latest_patches.get((major, minor))
+
+        if latest is None or parse_version(version) > parse_version(latest):
+            latest_patches[(major, minor)] = version
+
+    return list(latest_patches.values())
+
+
+def _get_tags_signature(octue_sdk_repo_path):
+    """Get a cheap signature of the repository's tags based on the modification times of the files git stores them in.
+    The signature changes when tags are added, removed, or fetched.
+
+    :param str octue_sdk_repo_path:
+    :return list(float)|None: `None` if the repository's git directory can't be found (e.g. for worktrees)
+    """
+    git_directory = os.path.join(octue_sdk_repo_path, ".git")
+
+    if not os.path.isdir(git_directory):
+        return None
+
+    signature = []
+
+    for path in (os.path.join(git_directory, "packed-refs"), os.path.join(git_directory, "refs", "tags")):
+        try:
+            signature.append(os.stat(path).st_mtime)
+        except FileNotFoundError:
+            signature.append(None)
+
+    return signature